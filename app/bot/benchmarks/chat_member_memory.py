@@ -0,0 +1,163 @@
+"""
+Compare Redis memory used by the legacy and the packed `RDChatMemberModel` payloads.
+
+Usage, from `app/bot`::
+
+    uv run python -m benchmarks.chat_member_memory --members 100000
+    uv run python -m benchmarks.chat_member_memory --redis-url redis://localhost:6379/15
+
+Without `--redis-url` only payload sizes are compared. With it, both formats are written into
+two hashes of the given (preferably empty) database, measured with `MEMORY USAGE` and removed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+from datetime import UTC, datetime, timedelta
+from typing import Final
+
+import msgspec
+from aiogram.enums import ChatMemberStatus
+from redis.asyncio import Redis
+
+from storages.redis.chat_member import RDChatMemberModel
+
+logger = logging.getLogger(__name__)
+
+CHAT_ID: Final[int] = -1001234567890
+BENCHMARK_KEY: Final[str] = "Benchmark:RDChatMemberModel:{}"
+TTL: Final[timedelta] = timedelta(minutes=10)
+
+
+def make_member(rnd: random.Random, user_id: int) -> RDChatMemberModel:
+    """Roughly the mix of a big group: mostly members, some admins, restricted and banned."""
+    roll = rnd.random()
+
+    if roll < 0.03:  # noqa: PLR2004
+        return RDChatMemberModel(
+            chat_id=CHAT_ID,
+            user_id=user_id,
+            status=ChatMemberStatus.ADMINISTRATOR,
+            can_be_edited=False,
+            is_anonymous=False,
+            can_manage_chat=True,
+            can_delete_messages=True,
+            can_manage_video_chats=rnd.random() < 0.5,  # noqa: PLR2004
+            can_restrict_members=True,
+            can_promote_members=False,
+            can_change_info=rnd.random() < 0.5,  # noqa: PLR2004
+            can_invite_users=True,
+            can_pin_messages=True,
+            can_manage_topics=False,
+            custom_title=rnd.choice((None, "moderator")),
+        )
+
+    if roll < 0.08:  # noqa: PLR2004
+        return RDChatMemberModel(
+            chat_id=CHAT_ID,
+            user_id=user_id,
+            status=ChatMemberStatus.RESTRICTED,
+            can_send_messages=False,
+            can_send_audios=False,
+            can_send_documents=False,
+            can_send_photos=False,
+            can_send_videos=False,
+            can_send_video_notes=False,
+            can_send_voice_notes=False,
+            can_send_polls=False,
+            can_send_other_messages=False,
+            can_add_web_page_previews=False,
+            can_change_info=False,
+            can_invite_users=True,
+            can_pin_messages=False,
+            can_manage_topics=False,
+            until_date=datetime.now(tz=UTC).replace(microsecond=0) + timedelta(days=1),
+        )
+
+    if roll < 0.1:  # noqa: PLR2004
+        return RDChatMemberModel(
+            chat_id=CHAT_ID,
+            user_id=user_id,
+            status=ChatMemberStatus.KICKED,
+            until_date=datetime(1970, 1, 1, tzinfo=UTC),
+        )
+
+    return RDChatMemberModel(chat_id=CHAT_ID, user_id=user_id, status=ChatMemberStatus.MEMBER)
+
+
+def make_payloads(members: int, seed: int) -> dict[str, tuple[bytes, bytes]]:
+    """`user_id` -> (legacy payload, packed payload)."""
+    rnd = random.Random(seed)  # noqa: S311
+    payloads = {}
+
+    for user_id in rnd.sample(range(10**8, 8 * 10**9), members):
+        model = make_member(rnd, user_id)
+        legacy, packed = msgspec.msgpack.encode(model), model.pack()
+
+        if RDChatMemberModel.unpack(CHAT_ID, user_id, packed) != model:
+            msg = f"Packed payload doesn't round-trip: {model!r}"
+            raise AssertionError(msg)
+
+        payloads[str(user_id)] = (legacy, packed)
+
+    return payloads
+
+
+async def measure_redis(url: str, payloads: dict[str, tuple[bytes, bytes]]) -> dict[str, int]:
+    redis = Redis.from_url(url)
+    usage = {}
+
+    try:
+        for index, name in enumerate(("legacy", "packed")):
+            key = BENCHMARK_KEY.format(name)
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_id, pair in payloads.items():
+                    pipe.hsetex(key, mapping={user_id: pair[index]}, ex=TTL)
+                await pipe.execute()
+
+            usage[name] = await redis.memory_usage(key, samples=0)
+            await redis.unlink(key)
+
+    finally:
+        await redis.aclose()
+
+    return usage
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.members, args.seed)
+    legacy = sum(len(pair[0]) for pair in payloads.values())
+    packed = sum(len(pair[1]) for pair in payloads.values())
+
+    logger.info(
+        "Payloads of %d members: legacy %d bytes (%.1f avg), packed %d bytes (%.1f avg), %.1fx",
+        args.members,
+        legacy,
+        legacy / args.members,
+        packed,
+        packed / args.members,
+        legacy / packed,
+    )
+
+    if args.redis_url:
+        usage = await measure_redis(args.redis_url, payloads)
+        logger.info(
+            "Redis MEMORY USAGE: legacy %d bytes, packed %d bytes, %.1fx",
+            usage["legacy"],
+            usage["packed"],
+            usage["legacy"] / usage["packed"],
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(main())
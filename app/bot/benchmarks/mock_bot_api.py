@@ -0,0 +1,211 @@
+"""
+Mock Bot API server for offline benchmarks and tests, with latency, flood and error injection.
+
+Usage, from `app/bot`::
+
+    uv run python -m benchmarks.mock_bot_api --port 8081 --latency 50 --jitter 20
+    uv run python -m benchmarks.mock_bot_api --chat-rate 1 --global-rate 30 --error-rate 0.01
+
+Point the bot at it with `BOT_API_URL=http://localhost:8081`. Results are the ones of
+`benchmarks.stub_api`. Messages over `--chat-rate` per chat or `--global-rate` in total per
+second get a 429 with `retry_after` like from Telegram, `--flood-rate` adds random ones. With
+`--error-rate` a share of requests fails with one of `INJECTED_ERRORS`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+from collections import Counter
+from itertools import count
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Final
+
+from aiogram.utils.token import TokenValidationError, extract_bot_id
+from aiohttp import web
+
+from benchmarks.stub_api import SUPPORTED_METHODS as STUB_METHODS
+from benchmarks.stub_api import stub_result
+from utils.outbound_scheduler import TokenBucket
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_METHODS: Final[frozenset[str]] = STUB_METHODS | {"getUpdates"}
+# Methods limited by `--chat-rate` and `--global-rate`, like on Telegram only new messages
+RATE_LIMITED_METHODS: Final[frozenset[str]] = frozenset({"sendMessage"})
+INJECTED_ERRORS: Final[tuple[tuple[int, str], ...]] = (
+    (400, "Bad Request: chat not found"),
+    (400, "Bad Request: message to edit not found"),
+    (400, "Bad Request: message to react not found"),
+    (403, "Forbidden: bot was blocked by the user"),
+    (403, "Forbidden: bot was kicked from the supergroup chat"),
+)
+MAX_POLLING_TIMEOUT: Final[float] = 1.0  # seconds `getUpdates` waits, it never has updates
+
+
+def parse_params(form: Mapping[str, Any]) -> dict[str, Any]:
+    """Form fields as sent by `AiohttpSession`, complex values are JSON encoded, files are kept."""
+    params: dict[str, Any] = {}
+    for name, value in form.items():
+        if not isinstance(value, str):
+            params[name] = value
+            continue
+
+        try:
+            params[name] = json.loads(value)
+        except ValueError:
+            params[name] = value
+    return params
+
+
+class MockBotAPI:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        chat_rate: float = 0.0,
+        global_rate: float = 0.0,
+        flood_rate: float = 0.0,
+        retry_after: int = 1,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency  # seconds, plus up to `jitter` seconds
+        self.jitter = jitter
+        self.chat_rate = chat_rate  # messages per second, 0 is unlimited
+        self.global_rate = global_rate
+        self.flood_rate = flood_rate  # share of requests answered with a 429
+        self.retry_after = retry_after
+        self.error_rate = error_rate  # share of requests failed with one of `INJECTED_ERRORS`
+        self.rnd = random.Random(seed)  # noqa: S311
+
+        self.requests: Counter[str] = Counter()
+        self.flooded: Counter[str] = Counter()
+        self.failed: Counter[str] = Counter()
+        self._message_ids = count(1)
+        self._global_bucket: TokenBucket | None = None
+        self._chat_buckets: dict[Any, TokenBucket] = {}
+
+    @staticmethod
+    def error(status: int, description: str, **parameters: Any) -> web.Response:
+        body: dict[str, Any] = {"ok": False, "error_code": status, "description": description}
+        if parameters:
+            body["parameters"] = parameters
+        return web.json_response(body, status=status)
+
+    def _flood_wait(self, chat_id: Any) -> float:
+        """Seconds until the message may be sent, takes the tokens if it may be sent now."""
+        now = monotonic()
+        buckets = []
+
+        if self.global_rate:
+            if self._global_bucket is None:
+                self._global_bucket = TokenBucket(self.global_rate, self.global_rate, now)
+            buckets.append(self._global_bucket)
+
+        if self.chat_rate:
+            if (bucket := self._chat_buckets.get(chat_id)) is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1, now)
+            buckets.append(bucket)
+
+        if wait := max((bucket.wait_time(now) for bucket in buckets), default=0.0):
+            return wait
+
+        for bucket in buckets:
+            bucket.take(now)
+        return 0.0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.requests[method] += 1
+
+        try:
+            bot_id = extract_bot_id(request.match_info["token"])
+        except TokenValidationError:
+            return self.error(401, "Unauthorized")
+
+        if method not in SUPPORTED_METHODS:
+            return self.error(404, "Not Found: method not found")
+
+        params = parse_params(await request.post())
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.rnd.random() * self.jitter)
+
+        if method == "getUpdates":
+            await asyncio.sleep(min(float(params.get("timeout") or 0), MAX_POLLING_TIMEOUT))
+            return web.json_response({"ok": True, "result": []})
+
+        if method in RATE_LIMITED_METHODS:
+            wait = self._flood_wait(params.get("chat_id"))
+            if not wait and self.rnd.random() < self.flood_rate:
+                wait = self.retry_after
+
+            if wait:
+                self.flooded[method] += 1
+                retry_after = math.ceil(wait)
+                return self.error(
+                    429, f"Too Many Requests: retry after {retry_after}", retry_after=retry_after
+                )
+
+        if self.rnd.random() < self.error_rate:
+            self.failed[method] += 1
+            return self.error(*self.rnd.choice(INJECTED_ERRORS))
+
+        result = stub_result(bot_id, method, params, next(self._message_ids))
+        return web.json_response({"ok": True, "result": result})
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{method} {total} ({self.flooded[method]} flooded, {self.failed[method]} failed)"
+            for method, total in self.requests.most_common()
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="ms per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="ms added at random")
+    parser.add_argument("--chat-rate", type=float, default=0.0, help="messages/s per chat")
+    parser.add_argument("--global-rate", type=float, default=0.0, help="messages/s in total")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="share of random 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="seconds, random 429")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    mock = MockBotAPI(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        chat_rate=args.chat_rate,
+        global_rate=args.global_rate,
+        flood_rate=args.flood_rate,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+    async def log_summary(_: web.Application) -> None:
+        logger.info("Requests: %s", mock.summary() or "none")
+
+    app = mock.application()
+    app.on_shutdown.append(log_summary)
+    web.run_app(app, host=args.host, port=args.port, print=logger.info)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,150 @@
+"""In-process stand-in for the Bot API, answers the methods the bot uses with plausible results."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import zlib
+from collections import Counter
+from time import time
+from typing import TYPE_CHECKING, Any, Final, cast
+
+from aiogram.client.session.base import BaseSession
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    from aiogram import Bot
+    from aiogram.methods import TelegramMethod
+    from aiogram.methods.base import TelegramType
+
+# Methods that return the sent or edited message
+MESSAGE_METHODS: Final[frozenset[str]] = frozenset(
+    {
+        "sendMessage",
+        "sendPhoto",
+        "sendDocument",
+        "sendSticker",
+        "copyMessage",
+        "forwardMessage",
+        "editMessageText",
+        "editMessageCaption",
+        "editMessageReplyMarkup",
+    },
+)
+# Methods that return `True`
+TRUE_METHODS: Final[frozenset[str]] = frozenset(
+    {
+        "setWebhook",
+        "deleteWebhook",
+        "setMyCommands",
+        "deleteMessage",
+        "answerCallbackQuery",
+        "setMessageReaction",
+        "sendChatAction",
+    },
+)
+SUPPORTED_METHODS: Final[frozenset[str]] = (
+    MESSAGE_METHODS
+    | TRUE_METHODS
+    | {
+        "getMe",
+        "getChatMember",
+        "getChatMemberCount",
+    }
+)
+NOT_FOUND: Final[dict[str, Any]] = {
+    "ok": False,
+    "error_code": 404,
+    "description": "Not Found: method not found",
+}
+CHAT_MEMBER_COUNT: Final[int] = 42
+CHANNEL_ID_OFFSET: Final[int] = 1_000_000_000_000
+
+
+def bot_user(bot_id: int) -> dict[str, Any]:
+    return {"id": bot_id, "is_bot": True, "first_name": "Bot", "username": "stub_bot"}
+
+
+def channel_id(username: str) -> int:
+    """Stable made-up id in the `-100...` range of channels and supergroups."""
+    return -(CHANNEL_ID_OFFSET + zlib.crc32(username.casefold().encode()))
+
+
+def stub_result(bot_id: int, api_method: str, params: dict[str, Any], message_id: int) -> Any:
+    """Raw JSON result of `api_method` called with `params`, one of `SUPPORTED_METHODS`."""
+    chat_id = params.get("chat_id") or 0
+
+    if api_method in MESSAGE_METHODS:
+        if isinstance(chat_id, str):  # `@username` of a channel or supergroup
+            chat_id = channel_id(chat_id)
+        return {
+            "message_id": params.get("message_id") or message_id,
+            "date": int(time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": bot_user(bot_id),
+            "text": str(params.get("text") or ""),
+        }
+
+    if api_method in TRUE_METHODS:
+        return True
+
+    match api_method:
+        case "getMe":
+            return bot_user(bot_id)
+        case "getChatMember":
+            user = {"id": params["user_id"], "is_bot": False, "first_name": "User"}
+            return {"status": "member", "user": user}
+        case "getChatMemberCount":
+            return CHAT_MEMBER_COUNT
+        case _:
+            msg = f"{api_method} isn't one of the supported methods"
+            raise ValueError(msg)
+
+
+class StubSession(BaseSession):
+    """Session that never hits the network, results are validated like real responses."""
+
+    def __init__(self, latency: float = 0.0, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.latency = latency  # seconds per request
+        self.requests: Counter[str] = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,  # noqa: ARG002, ASYNC109
+    ) -> TelegramType:
+        self.requests[method.__api_method__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method.__api_method__ not in SUPPORTED_METHODS:
+            status_code, body = 404, NOT_FOUND
+        else:
+            result = stub_result(
+                bot.id,
+                method.__api_method__,
+                method.model_dump(exclude_none=True),
+                next(self._message_ids),
+            )
+            status_code, body = 200, {"ok": True, "result": result}
+
+        # Raises like for a real response on errors
+        response = self.check_response(
+            bot=bot,
+            method=method,
+            status_code=status_code,
+            content=self.json_dumps(body),
+        )
+        return cast("TelegramType", response.result)
+
+    async def stream_content(self, *_: Any, **__: Any) -> AsyncGenerator[bytes]:
+        """There are no files, downloads are empty."""
+        return
+        yield  # Makes it a generator
@@ -0,0 +1,374 @@
+"""
+Feed a stream of updates through the bot and report throughput, latency and operations.
+
+Usage, from `app/bot`, with the bot environment (`BOT_TOKEN`, `PSQL_*`, `REDIS_*`, ...) set::
+
+    uv run python -m benchmarks.update_replay --updates 10000 --concurrency 100
+    uv run python -m benchmarks.update_replay --save updates.jsonl --updates 10000
+    uv run python -m benchmarks.update_replay --replay updates.jsonl --api-latency 50
+    uv run python -m benchmarks.update_replay --redis-url redis://localhost:6379/15
+    uv run python -m benchmarks.update_replay --fake-redis
+
+By default updates go through `Dispatcher.feed_update` of a dispatcher built like in
+`main.py`, with Bot API calls answered by `StubSession`, or by the server at `BOT_API_URL`
+(see `benchmarks.mock_bot_api`) if it's set. Postgres is the one from the
+settings, Redis too unless `--redis-url` or `--fake-redis` (needs `fakeredis`) is given.
+
+With `--webhook-url` updates are posted to a running bot instead, Redis, SQL and Bot API
+operations are then read from its `--metrics-url`. The webhook answers before the update is
+processed, so latency is only the time to accept it.
+
+Updates are generated (private commands, group messages with replies, button presses and
+chat member churn) or read from a JSON lines file of raw updates, as Telegram sends them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+from collections import defaultdict
+from itertools import count
+from pathlib import Path
+from time import perf_counter, time
+from typing import TYPE_CHECKING, Any, Final
+
+from aiogram.types import Update
+from aiogram.utils.token import extract_bot_id
+from aiohttp import ClientSession
+
+from benchmarks.stub_api import StubSession
+from handlers.cbs.start import GOTOStartCB
+from handlers.cbs.universal_close import UniversalWindowCloseCB
+from main import configure, create_bot, create_dispatcher
+from settings import Settings
+from storages.redis.traced import TracedRedis
+from utils.callback_datas import LanguageWindowCB, PossibleLanguages, SelectLanguageCB
+from utils.metrics import METRICS
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterator
+
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+type RawUpdate = dict[str, Any]
+
+# Update kind -> share of the generated stream
+UPDATE_MIX: Final[dict[str, float]] = {
+    "private_command": 0.25,
+    "group_message": 0.45,
+    "callback": 0.2,
+    "chat_member": 0.1,
+}
+PRIVATE_COMMANDS: Final[tuple[str, ...]] = ("/start", "/start ref", "/language", "/lang", "hi")
+REPLY_SHARE: Final[float] = 0.3
+# Counters of `utils.metrics` reported per update, without the `bot_` namespace
+OPERATION_COUNTERS: Final[dict[str, str]] = {
+    "redis_commands_total": "Redis commands",
+    "sql_statements_total": "SQL statements",
+    "bot_api_requests_total": "Bot API requests",
+}
+
+
+class UpdateFactory:
+    """Raw updates of `users` users writing in private chats and `groups` groups."""
+
+    def __init__(self, rnd: random.Random, bot_id: int, users: int, groups: int) -> None:
+        self.rnd = rnd
+        self.bot_id = bot_id
+        self.users = [10**8 + i for i in range(users)]
+        self.groups = [-(10**12) - i for i in range(groups)]
+        self._update_ids = count(1)
+        self._message_ids = count(1)
+
+    def user(self, user_id: int) -> dict[str, Any]:
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"User {user_id}",
+            "language_code": self.rnd.choice(("en", "uk", "de")),
+        }
+
+    def message(self, chat: dict[str, Any], user_id: int, text: str) -> dict[str, Any]:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time()),
+            "chat": chat,
+            "from": self.user(user_id),
+            "text": text,
+        }
+
+    def private_command(self) -> RawUpdate:
+        user_id = self.rnd.choice(self.users)
+        chat = {"id": user_id, "type": "private", "first_name": f"User {user_id}"}
+        return {"message": self.message(chat, user_id, self.rnd.choice(PRIVATE_COMMANDS))}
+
+    def group_message(self) -> RawUpdate:
+        chat = {"id": self.rnd.choice(self.groups), "type": "supergroup", "title": "Group"}
+        message = self.message(chat, self.rnd.choice(self.users), "Hello there")
+
+        if self.rnd.random() < REPLY_SHARE:
+            message["reply_to_message"] = self.message(chat, self.rnd.choice(self.users), "Hi")
+        return {"message": message}
+
+    def callback(self) -> RawUpdate:
+        user_id = self.rnd.choice(self.users)
+        template = self.rnd.choice(
+            (
+                GOTOStartCB.template(),
+                LanguageWindowCB.template(),
+                SelectLanguageCB.template(language=self.rnd.choice(list(PossibleLanguages))),
+                UniversalWindowCloseCB.template(),
+            ),
+        )
+        chat = {"id": user_id, "type": "private", "first_name": f"User {user_id}"}
+        message = self.message(chat, user_id, "Window")
+        message["from"] = {"id": self.bot_id, "is_bot": True, "first_name": "Bot"}
+
+        return {
+            "callback_query": {
+                "id": str(next(self._message_ids)),
+                "from": self.user(user_id),
+                "chat_instance": str(user_id),
+                "message": message,
+                "data": template.pack(user_id),
+            },
+        }
+
+    def chat_member(self) -> RawUpdate:
+        user = self.user(self.rnd.choice(self.users))
+        old, new = self.rnd.choice((("left", "member"), ("member", "left"), ("member", "kicked")))
+
+        return {
+            "chat_member": {
+                "chat": {"id": self.rnd.choice(self.groups), "type": "supergroup", "title": "G"},
+                "from": user,
+                "date": int(time()),
+                "old_chat_member": {"status": old, "user": user},
+                "new_chat_member": (
+                    {"status": new, "user": user, "until_date": 0}
+                    if new == "kicked"
+                    else {"status": new, "user": user}
+                ),
+            },
+        }
+
+    def generate(self, updates: int) -> Iterator[RawUpdate]:
+        kinds, weights = list(UPDATE_MIX), list(UPDATE_MIX.values())
+
+        for kind in self.rnd.choices(kinds, weights, k=updates):
+            yield {"update_id": next(self._update_ids), **getattr(self, kind)()}
+
+
+def update_type(raw: RawUpdate) -> str:
+    return next(key for key in raw if key != "update_id")
+
+
+def read_counters(text: str) -> dict[str, float]:
+    """Sum samples of `OPERATION_COUNTERS` in a Prometheus text exposition over all labels."""
+    totals = dict.fromkeys(OPERATION_COUNTERS, 0.0)
+
+    for line in text.splitlines():
+        if line.startswith("#") or not line:
+            continue
+
+        name, _, value = line.rpartition(" ")
+        name = name.split("{", 1)[0].removeprefix(f"{METRICS.namespace}_")
+        if name in totals:
+            totals[name] += float(value)
+
+    return totals
+
+
+async def run(
+    feed: Callable[[RawUpdate], Awaitable[None]],
+    updates: list[RawUpdate],
+    concurrency: int,
+) -> tuple[float, dict[str, list[float]], int]:
+    """Feed `updates` from `concurrency` workers, return wall time, latencies and failures."""
+    latencies: dict[str, list[float]] = defaultdict(list)
+    failed = 0
+    stream = iter(updates)
+
+    async def worker() -> None:
+        nonlocal failed
+        for raw in stream:
+            started = perf_counter()
+            try:
+                await feed(raw)
+            except Exception:
+                failed += 1
+                logger.exception("Update %s failed", raw.get("update_id"))
+                continue
+            latencies[update_type(raw)].append(perf_counter() - started)
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return perf_counter() - started, latencies, failed
+
+
+def percentiles(values: list[float]) -> str:
+    if len(values) < 2:  # noqa: PLR2004
+        return f"max {max(values, default=0) * 1000:.2f}"
+
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return (
+        f"p50 {cuts[49] * 1000:.2f}, p90 {cuts[89] * 1000:.2f}, "
+        f"p99 {cuts[98] * 1000:.2f}, max {max(values) * 1000:.2f}"
+    )
+
+
+def report(
+    elapsed: float,
+    latencies: dict[str, list[float]],
+    failed: int,
+    operations: dict[str, float],
+) -> None:
+    total = sum(len(values) for values in latencies.values())
+    logger.info(
+        "Updates: %d in %.2fs, %.1f updates/s, %d failed",
+        total,
+        elapsed,
+        total / elapsed,
+        failed,
+    )
+    logger.info("Latency ms, all: %s", percentiles([v for vs in latencies.values() for v in vs]))
+    for kind, values in sorted(latencies.items()):
+        logger.info("Latency ms, %s (%d): %s", kind, len(values), percentiles(values))
+
+    logger.info(
+        "Per update: %s",
+        ", ".join(
+            f"{operations[name] / max(total, 1):.2f} {title}"
+            for name, title in OPERATION_COUNTERS.items()
+        ),
+    )
+
+
+async def create_redis(args: argparse.Namespace, settings: Settings) -> Redis:
+    if args.fake_redis:
+        try:
+            from fakeredis import FakeAsyncRedis  # noqa: PLC0415
+        except ImportError:
+            msg = "`--fake-redis` needs `fakeredis` installed"
+            raise SystemExit(msg) from None
+
+        # The traced client counts commands, the fake one only provides its connections
+        return TracedRedis(connection_pool=FakeAsyncRedis().connection_pool)
+
+    if args.redis_url:
+        return TracedRedis.from_url(args.redis_url)
+
+    return await settings.redis_dsn(TracedRedis)
+
+
+async def run_in_process(
+    args: argparse.Namespace, settings: Settings, updates: list[RawUpdate]
+) -> None:
+    settings = settings.model_copy(update={"webhooks": False, "metrics_port": 0})
+
+    # `BOT_API_URL` selects a Bot API server, like `benchmarks.mock_bot_api`
+    session = None if settings.bot_api_url else StubSession(latency=args.api_latency / 1000)
+    bot = create_bot(settings, session)
+    dp = create_dispatcher(settings, bot, await create_redis(args, settings))
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+
+    async def feed(raw: RawUpdate) -> None:
+        await dp.feed_update(bot, Update.model_validate(raw, context={"bot": bot}))
+
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        before = read_counters(METRICS.render())
+        elapsed, latencies, failed = await run(feed, updates, args.concurrency)
+        after = read_counters(METRICS.render())
+    finally:
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await dp.storage.close()
+        await bot.session.close()
+
+    report(elapsed, latencies, failed, {name: after[name] - before[name] for name in after})
+
+
+async def run_webhook(args: argparse.Namespace, updates: list[RawUpdate]) -> None:
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.webhook_secret or ""}
+
+    async with ClientSession() as session:
+
+        async def scrape() -> dict[str, float]:
+            if not args.metrics_url:
+                return dict.fromkeys(OPERATION_COUNTERS, 0.0)
+            async with session.get(args.metrics_url) as response:
+                return read_counters(await response.text())
+
+        async def feed(raw: RawUpdate) -> None:
+            async with session.post(args.webhook_url, json=raw, headers=headers) as response:
+                response.raise_for_status()
+
+        before = await scrape()
+        elapsed, latencies, failed = await run(feed, updates, args.concurrency)
+        await asyncio.sleep(args.settle)  # Let the bot finish the updates in the background
+        after = await scrape()
+
+    report(elapsed, latencies, failed, {name: after[name] - before[name] for name in after})
+
+
+def load_updates(args: argparse.Namespace, settings: Settings) -> list[RawUpdate]:
+    if args.replay:
+        with Path(args.replay).open(encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    factory = UpdateFactory(
+        random.Random(args.seed),  # noqa: S311
+        extract_bot_id(settings.bot_token.get_secret_value()),
+        args.users,
+        args.groups,
+    )
+    return list(factory.generate(args.updates))
+
+
+def save_updates(path: str, updates: list[RawUpdate]) -> None:
+    with Path(path).open("w", encoding="utf-8") as file:
+        file.writelines(json.dumps(raw) + "\n" for raw in updates)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", default=None, help="JSON lines file of raw updates")
+    parser.add_argument("--save", default=None, help="write the updates to a JSON lines file")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="ms per Bot API call")
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--fake-redis", action="store_true")
+    parser.add_argument("--webhook-url", default=None)
+    parser.add_argument("--webhook-secret", default=None)
+    parser.add_argument("--metrics-url", default=None)
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds, webhook mode")
+    args = parser.parse_args()
+
+    settings = Settings()
+    configure(settings)  # Callback data of generated presses is signed with the bot token
+    updates = load_updates(args, settings)
+
+    if args.save:
+        save_updates(args.save, updates)
+        logger.info("Saved %d updates to %s", len(updates), args.save)
+
+    if args.webhook_url:
+        await run_webhook(args, updates)
+    else:
+        await run_in_process(args, settings, updates)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)  # A line per update
+    asyncio.run(main())
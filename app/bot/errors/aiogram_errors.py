@@ -5,22 +5,29 @@
 
 from aiogram import Router
 
+from utils.queued_logging import ERRORS_LOG
+
 if TYPE_CHECKING:
     from aiogram.types import ErrorEvent
 
+    from utils.alert_digest import AlertDigest
+
 router = Router()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
-
-file_handler = logging.FileHandler("errors.log", encoding="utf-8")
-formatter = logging.Formatter(
-    "%(levelname)s:%(name)s - %(asctime)s - on line `%(lineno)d`\n%(message)s\n",
-)
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.ERROR)
-logger.addHandler(file_handler)
+ERRORS_LOG.attach(logger)
 
 
 @router.errors()
-async def errors_handler(event: ErrorEvent) -> None:
-    logger.error("Update: (%s)\nException: %s\n", event.update, event.exception)
+async def errors_handler(event: ErrorEvent, alert_digest: AlertDigest) -> None:
+    alert_digest.add(
+        f"{type(event.exception).__name__}: {str(event.exception)[:100]}",
+        f"Update id: {event.update.update_id} ({event.update.event_type})\n"
+        f"Exception: {event.exception!r}",
+    )
+    logger.error(
+        "Update: (%s)\nException: %s\n",
+        event.update,
+        event.exception,
+        extra={"sample_key": (type(event.exception), str(event.exception))},
+    )
@@ -1,225 +1,202 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Any, ClassVar, Final
+
 from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
 
+if TYPE_CHECKING:
+    from re import Pattern
+
+ERRORS_BY_MESSAGE: Final[dict[str, type[TelegramAPIError]]] = {}
+# Errors with parameterised messages, checked in definition order if the message isn't known
+ERRORS_BY_PATTERN: Final[list[tuple[Pattern[str], type[TelegramAPIError]]]] = []
+# Resolved errors by class name, unknown errors are counted under the aiogram class name
+ERROR_COUNTERS: Final[Counter[str]] = Counter()
+
+
+class ResolvableError:
+    """
+    Mixin for errors `resolve_exception` recognises.
+
+    A subclass registers its exact `message`, or its `pattern` for parameterised messages, when
+    it's defined. Put it before the aiogram exception in bases.
+    """
+
+    pattern: ClassVar[Pattern[str] | None] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if not issubclass(cls, TelegramAPIError):
+            msg = f"{cls.__name__} must be a subclass of TelegramAPIError"
+            raise TypeError(msg)
+
+        if (pattern := cls.__dict__.get("pattern")) is not None:
+            ERRORS_BY_PATTERN.append((pattern, cls))
+
+        if (message := cls.__dict__.get("message")) is not None:
+            if (registered := ERRORS_BY_MESSAGE.get(message)) is not None:
+                msg = (
+                    f"Collision detected for error message: {cls.__name__} - {registered.__name__}"
+                )
+                raise ValueError(msg)
+            ERRORS_BY_MESSAGE[message] = cls
 
-class UserIsAnAdministratorError(TelegramBadRequest):
+
+class UserIsAnAdministratorError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: user is an administrator of the chat"
 
 
-class CantRestrictSelfError(TelegramBadRequest):
+class CantRestrictSelfError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: can't restrict self"
 
 
-class NotEnoughRightsError(TelegramBadRequest):
+class NotEnoughRightsError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: not enough rights"
 
 
-class NotEnoughRightsToRestrictError(TelegramBadRequest):
+class NotEnoughRightsToRestrictError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: not enough rights to restrict/unrestrict chat member"
 
 
-class TopicClosedError(TelegramBadRequest):
+class TopicClosedError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: TOPIC_CLOSED"
 
 
-class ChatNotFoundError(TelegramBadRequest):
+class ChatNotFoundError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: chat not found"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: CHAT_RESTRICTED
-class ChatRestrictedError(TelegramBadRequest):
+class ChatRestrictedError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: CHAT_RESTRICTED"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: bot was kicked from
 # the supergroup chat
-class BotWasKickedFromSuperGroupError(TelegramForbiddenError):
+class BotWasKickedFromSuperGroupError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: bot was kicked from the supergroup chat"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: REACTION_INVALID
-class ReactionInvalidError(TelegramBadRequest):
+class ReactionInvalidError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: REACTION_INVALID"
 
 
+# aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: not enough rights to
+# send photos to the chat
+class NotEnoughRightsToSendError(ResolvableError, TelegramBadRequest):
+    pattern = re.compile(r"Bad Request: not enough rights to send .+ to the chat")
+
+
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: not enough rights to
 # send text messages to the chat
-class NotEnoughRightsToSendTextError(TelegramBadRequest):
+class NotEnoughRightsToSendTextError(NotEnoughRightsToSendError):
     message = "Bad Request: not enough rights to send text messages to the chat"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: MESSAGE_ID_INVALID
-class MessageIdInvalidError(TelegramBadRequest):
+class MessageIdInvalidError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: MESSAGE_ID_INVALID"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: bot was blocked by
 # the user
-class BotWasBlockedByUserError(TelegramForbiddenError):
+class BotWasBlockedByUserError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: bot was blocked by the user"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: bot was kicked
 # from the group chat
-class BotWasKickedFromGroupError(TelegramForbiddenError):
+class BotWasKickedFromGroupError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: bot was kicked from the group chat"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: bot was kicked
 # from the channel chat
-class BotWasKickedFromChannelError(TelegramForbiddenError):
+class BotWasKickedFromChannelError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: bot was kicked from the channel chat"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: channel direct
 # messages topic must be specified
-class ChannelDirectMessagesTopicMustBeSpecifiedError(TelegramBadRequest):
+class ChannelDirectMessagesTopicMustBeSpecifiedError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: channel direct messages topic must be specified"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: can't remove chat owner
-class CantRemoveChatOwnerError(TelegramBadRequest):
+class CantRemoveChatOwnerError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: can't remove chat owner"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: CHAT_ADMIN_REQUIRED
-class ChatAdminRequiredError(TelegramBadRequest):
+class ChatAdminRequiredError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: CHAT_ADMIN_REQUIRED"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: message to react not
 # found
-class MessageToReactNotFoundError(TelegramBadRequest):
+class MessageToReactNotFoundError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: message to react not found"
 
 
 # aiogram.exceptions.TelegramNetworkError: HTTP Client says - Request timeout error
-class RequestTimeoutError(TelegramAPIError):
+class RequestTimeoutError(ResolvableError, TelegramAPIError):
     message = "HTTP Client says - Request timeout error"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: CHAT_WRITE_FORBIDDEN
-class ChatWriteForbiddenError(TelegramBadRequest):
+class ChatWriteForbiddenError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: CHAT_WRITE_FORBIDDEN"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: the group chat was
 # deleted
-class ChatDeletedError(TelegramForbiddenError):
+class ChatDeletedError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: the group chat was deleted"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: chat actions can't be
 # sent to channel direct messages chats
-class ChatActionsForbiddenInChannelDirectMessagesError(TelegramBadRequest):
+class ChatActionsForbiddenInChannelDirectMessagesError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: chat actions can't be sent to channel direct messages chats"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: bot is not a member
 # of the group chat
-class BotNotMemberOfGroupError(TelegramForbiddenError):
+class BotNotMemberOfGroupError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: bot is not a member of the group chat"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: bot is not a member
 # of the supergroup chat
-class BotNotMemberOfSuperGroupError(TelegramForbiddenError):
+class BotNotMemberOfSuperGroupError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: bot is not a member of the supergroup chat"
 
 
 # aiogram.exceptions.TelegramForbiddenError: Telegram server says - Forbidden: bot is not a member
 # of the channel chat
-class BotNotMemberOfChannelError(TelegramForbiddenError):
+class BotNotMemberOfChannelError(ResolvableError, TelegramForbiddenError):
     message = "Forbidden: bot is not a member of the channel chat"
 
 
 # aiogram.exceptions.TelegramBadRequest: Telegram server says - Bad Request: CHANNEL_PRIVATE
-class ChannelPrivateError(TelegramBadRequest):
+class ChannelPrivateError(ResolvableError, TelegramBadRequest):
     message = "Bad Request: CHANNEL_PRIVATE"
 
 
 def resolve_exception(exception: TelegramAPIError) -> TelegramAPIError:
-    match exception.message:
-        case UserIsAnAdministratorError.message as message:
-            return UserIsAnAdministratorError(method=exception.method, message=message)
-
-        case CantRestrictSelfError.message as message:
-            return CantRestrictSelfError(method=exception.method, message=message)
-
-        case NotEnoughRightsError.message as message:
-            return NotEnoughRightsError(method=exception.method, message=message)
-
-        case NotEnoughRightsToRestrictError.message as message:
-            return NotEnoughRightsToRestrictError(method=exception.method, message=message)
-
-        case TopicClosedError.message as message:
-            return TopicClosedError(method=exception.method, message=message)
-
-        case ChatNotFoundError.message as message:
-            return ChatNotFoundError(method=exception.method, message=message)
-
-        case ChatRestrictedError.message as message:
-            return ChatRestrictedError(method=exception.method, message=message)
-
-        case BotWasBlockedByUserError.message as message:
-            return BotWasBlockedByUserError(method=exception.method, message=message)
-
-        case BotWasKickedFromSuperGroupError.message as message:
-            return BotWasKickedFromSuperGroupError(method=exception.method, message=message)
-
-        case ReactionInvalidError.message as message:
-            return ReactionInvalidError(method=exception.method, message=message)
-
-        case NotEnoughRightsToSendTextError.message as message:
-            return NotEnoughRightsToSendTextError(method=exception.method, message=message)
-
-        case MessageIdInvalidError.message as message:
-            return MessageIdInvalidError(method=exception.method, message=message)
-
-        case BotWasKickedFromGroupError.message as message:
-            return BotWasKickedFromGroupError(method=exception.method, message=message)
-
-        case BotWasKickedFromChannelError.message as message:
-            return BotWasKickedFromChannelError(method=exception.method, message=message)
-
-        case ChannelDirectMessagesTopicMustBeSpecifiedError.message as message:
-            return ChannelDirectMessagesTopicMustBeSpecifiedError(
-                method=exception.method, message=message
-            )
-
-        case CantRemoveChatOwnerError.message as message:
-            return CantRemoveChatOwnerError(method=exception.method, message=message)
-
-        case ChatAdminRequiredError.message as message:
-            return ChatAdminRequiredError(method=exception.method, message=message)
-
-        case MessageToReactNotFoundError.message as message:
-            return MessageToReactNotFoundError(method=exception.method, message=message)
-
-        case RequestTimeoutError.message as message:
-            return RequestTimeoutError(method=exception.method, message=message)
-
-        case ChatWriteForbiddenError.message as message:
-            return ChatWriteForbiddenError(method=exception.method, message=message)
-
-        case ChatDeletedError.message as message:
-            return ChatDeletedError(method=exception.method, message=message)
-
-        case ChatActionsForbiddenInChannelDirectMessagesError.message as message:
-            return ChatActionsForbiddenInChannelDirectMessagesError(
-                method=exception.method, message=message
-            )
-
-        case BotNotMemberOfGroupError.message as message:
-            return BotNotMemberOfGroupError(method=exception.method, message=message)
-
-        case BotNotMemberOfSuperGroupError.message as message:
-            return BotNotMemberOfSuperGroupError(method=exception.method, message=message)
-
-        case BotNotMemberOfChannelError.message as message:
-            return BotNotMemberOfChannelError(method=exception.method, message=message)
-
-        case ChannelPrivateError.message as message:
-            return ChannelPrivateError(method=exception.method, message=message)
-
-        case _:
-            return exception
+    """Return the registered error for the message of `exception`, or `exception` itself."""
+    if (error := ERRORS_BY_MESSAGE.get(exception.message)) is None:
+        error = next(
+            (error for pattern, error in ERRORS_BY_PATTERN if pattern.fullmatch(exception.message)),
+            None,
+        )
+
+    if error is None or isinstance(exception, error):
+        ERROR_COUNTERS[type(exception).__name__] += 1
+        return exception
+
+    ERROR_COUNTERS[error.__name__] += 1
+    return error(method=exception.method, message=exception.message)
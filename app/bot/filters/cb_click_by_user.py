@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from datetime import timedelta
-from typing import TYPE_CHECKING, Self
+from typing import TYPE_CHECKING, ClassVar
 
-import msgspec
 from aiogram.filters import Filter
 
+from storages.redis.base import ChatHashModel, TTLPolicy
+from storages.redis.key_schema import RedisKeyPrefix
+from utils.signed_callback_data import SignedOwnerCallbackData
+
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
@@ -17,6 +20,13 @@
     from utils.callback_datas import OwnerCallbackData
 
 
+async def mark_deprecated(cb: CallbackQuery, i18n: I18nContext) -> None:
+    if cb.message.text:
+        await cb.message.edit_text(i18n.message.deprecated())
+    else:
+        await cb.message.edit_caption(caption=i18n.message.deprecated())
+
+
 class CallbackClickedByTargetUser(Filter):
     async def __call__(
         self,
@@ -33,19 +43,43 @@ async def __call__(
         return True
 
 
-class MsgOwner(msgspec.Struct, kw_only=True, array_like=True):
-    owner_id: int
+class CallbackClickedBySignedOwner(Filter):
+    """
+    Checks the owner of `SignedOwnerCallbackData` without I/O, use after `SomeCB.filter()`.
 
-    @classmethod
-    def key(cls, chat_id: int, message_id: int) -> str:
-        return f"{cls.__name__}:{chat_id}:{message_id}"
+    Ownership can't be revoked or shared, use `CallbackClickedByRedisUser` or
+    `CallbackClickedByMultipleRedisUser` with a `MsgOwner`/`MsgMultipleOwners` record for that.
+    """
+
+    async def __call__(
+        self,
+        cb: CallbackQuery,
+        i18n: I18nContext,
+        callback_data: SignedOwnerCallbackData | None = None,
+    ) -> bool:
+        if not isinstance(callback_data, SignedOwnerCallbackData):
+            return False
+
+        if (
+            cb.data is None
+            or not callback_data.is_signed(cb.data)
+            or cb.from_user.id != callback_data.owner_id
+        ):
+            await cb.answer("❌", show_alert=True)
+            return False
+
+        if callback_data.expired:
+            await mark_deprecated(cb, i18n)
+            return False
+
+        return True
 
-    @classmethod
-    async def get(cls, redis: Redis, chat_id: int, message_id: int) -> Self | None:
-        data = await redis.get(cls.key(chat_id, message_id))
-        if data:
-            return msgspec.msgpack.decode(data, type=cls)
-        return None
+
+class MsgOwner(ChatHashModel, kw_only=True, array_like=True):
+    key_prefix: ClassVar[str] = RedisKeyPrefix.msg_owner
+    ttl_policy: ClassVar[TTLPolicy] = TTLPolicy(timedelta(days=2))
+
+    owner_id: int
 
     @classmethod
     async def set(
@@ -54,29 +88,16 @@ async def set(
         chat_id: int,
         message_id: int,
         owner_id: int,
-        ttl: ExpiryT = timedelta(days=2),
-    ) -> int:
-        return await redis.setex(
-            name=cls.key(chat_id, message_id),
-            time=ttl,
-            value=msgspec.msgpack.encode(cls(owner_id=owner_id)),
-        )
-
-    @classmethod
-    async def delete(cls, redis: Redis, chat_id: int, message_id: int) -> None:
-        await redis.delete(cls.key(chat_id, message_id))
+        ttl: ExpiryT | None = None,
+    ) -> bool:
+        return await cls.put(redis, (chat_id, message_id), cls(owner_id=owner_id), ttl)
 
 
 class CallbackClickedByRedisUser(Filter):
     async def __call__(self, cb: CallbackQuery, i18n: I18nContext, redis: Redis) -> bool:
-        message_owner = await MsgOwner.get(
-            redis=redis, chat_id=cb.message.chat.id, message_id=cb.message.message_id
-        )
+        message_owner = await MsgOwner.get(redis, cb.message.chat.id, cb.message.message_id)
         if not message_owner:
-            if cb.message.text:
-                await cb.message.edit_text(i18n.message.deprecated())
-            else:
-                await cb.message.edit_caption(caption=i18n.message.deprecated())
+            await mark_deprecated(cb, i18n)
             return False
 
         if cb.from_user.id != message_owner.owner_id:
@@ -86,19 +107,11 @@ async def __call__(self, cb: CallbackQuery, i18n: I18nContext, redis: Redis) ->
         return True
 
 
-class MsgMultipleOwners(msgspec.Struct, kw_only=True, array_like=True):
-    owner_ids: frozenset[int]
+class MsgMultipleOwners(ChatHashModel, kw_only=True, array_like=True):
+    key_prefix: ClassVar[str] = RedisKeyPrefix.msg_multiple_owners
+    ttl_policy: ClassVar[TTLPolicy] = TTLPolicy(timedelta(days=2))
 
-    @classmethod
-    def key(cls, chat_id: int, message_id: int) -> str:
-        return f"{cls.__name__}:{chat_id}:{message_id}"
-
-    @classmethod
-    async def get(cls, redis: Redis, chat_id: int, message_id: int) -> Self | None:
-        data = await redis.get(cls.key(chat_id, message_id))
-        if data:
-            return msgspec.msgpack.decode(data, type=cls)
-        return None
+    owner_ids: frozenset[int]
 
     @classmethod
     async def set(
@@ -107,29 +120,18 @@ async def set(
         chat_id: int,
         message_id: int,
         owner_ids: Sequence[int],
-        ttl: ExpiryT = timedelta(days=2),
-    ) -> int:
-        return await redis.setex(
-            name=cls.key(chat_id, message_id),
-            time=ttl,
-            value=msgspec.msgpack.encode(cls(owner_ids=frozenset(owner_ids))),
-        )
-
-    @classmethod
-    async def delete(cls, redis: Redis, chat_id: int, message_id: int) -> None:
-        await redis.delete(cls.key(chat_id, message_id))
+        ttl: ExpiryT | None = None,
+    ) -> bool:
+        return await cls.put(redis, (chat_id, message_id), cls(owner_ids=frozenset(owner_ids)), ttl)
 
 
 class CallbackClickedByMultipleRedisUser(Filter):
     async def __call__(self, cb: CallbackQuery, i18n: I18nContext, redis: Redis) -> bool:
         message_owners = await MsgMultipleOwners.get(
-            redis=redis, chat_id=cb.message.chat.id, message_id=cb.message.message_id
+            redis, cb.message.chat.id, cb.message.message_id
         )
         if not message_owners:
-            if cb.message.text:
-                await cb.message.edit_text(i18n.message.deprecated())
-            else:
-                await cb.message.edit_caption(caption=i18n.message.deprecated())
+            await mark_deprecated(cb, i18n)
             return False
 
         if cb.from_user.id not in message_owners.owner_ids:
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from aiogram.filters import Filter
+
+if TYPE_CHECKING:
+    from aiogram.types import Message
+
+
+class IsDeveloper(Filter):
+    async def __call__(self, msg: Message, developer_id: int) -> bool:
+        return msg.from_user is not None and msg.from_user.id == developer_id
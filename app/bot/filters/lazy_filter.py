@@ -1,51 +1,113 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Final
 
 from aiogram.filters import Filter
 
 if TYPE_CHECKING:
     from aiogram.types import Message
     from aiogram_i18n import I18nContext
+    from aiogram_i18n.cores import BaseCore
+
+type LazyMatch = frozenset[tuple[str, bool]]  # (FTL key, casefold) of matching filters
+
+NO_MATCH: Final[LazyMatch] = frozenset()
+
+
+class LazyFilterIndex:
+    """
+    All `LazyFilter` keys compiled into text -> keys dictionaries for every locale.
+
+    `match` finds the filters a text matches with one lookup per dictionary. It's done once per
+    message by `LazyFilterMiddleware`, then every `LazyFilter` only checks its key in the result.
+    """
+
+    def __init__(self) -> None:
+        self.filters: list[LazyFilter] = []
+        self._exact: dict[str, LazyMatch] = {}
+        self._casefolded: dict[str, LazyMatch] = {}
+        self.is_built: bool = False
+
+    def register(self, lazy_filter: LazyFilter) -> None:
+        self.filters.append(lazy_filter)
+        self.is_built = False
+
+    def build(self, core: BaseCore[Any]) -> None:
+        """Compile the index from the current locales, replacing the previous one."""
+        exact: dict[str, set[tuple[str, bool]]] = {}
+        casefolded: dict[str, set[tuple[str, bool]]] = {}
+
+        for lazy_filter in self.filters:
+            for locale in core.available_locales:
+                text = core.get(lazy_filter.key, locale)
+                if lazy_filter.casefold:
+                    casefolded.setdefault(text.casefold(), set()).add((lazy_filter.key, True))
+                else:
+                    exact.setdefault(text, set()).add((lazy_filter.key, False))
+
+        self._exact = {text: frozenset(keys) for text, keys in exact.items()}
+        self._casefolded = {text: frozenset(keys) for text, keys in casefolded.items()}
+        self.is_built = True
+
+    def match(self, text: str | None) -> LazyMatch:
+        if not text:
+            return NO_MATCH
+
+        exact = self._exact.get(text, NO_MATCH)
+        if not (casefolded := self._casefolded.get(text.casefold(), NO_MATCH)):
+            return exact
+        return exact | casefolded if exact else casefolded
+
+
+LAZY_FILTER_INDEX: Final[LazyFilterIndex] = LazyFilterIndex()
+
+
+def _resolve_match(event: Message, i18n: I18nContext, lazy_match: LazyMatch | None) -> LazyMatch:
+    if lazy_match is None:  # `LazyFilterMiddleware` isn't registered for this event
+        if not LAZY_FILTER_INDEX.is_built:
+            # Temporary solution, because of https://github.com/aiogram/i18n/issues/38
+            LAZY_FILTER_INDEX.build(i18n.core)
+        lazy_match = LAZY_FILTER_INDEX.match(event.text or event.caption)
+    return lazy_match
 
 
 class LazyFilter(Filter):
     """
     I don't like `LazyFilter` provided by `aiogram-i18n`, so I've created my own version of
     it.
+
+    Texts of all filters are looked up at once in `LAZY_FILTER_INDEX`, see `LazyFilterIndex`.
     """
 
     def __init__(self, key: str, casefold: bool = True, **__: Any) -> None:
         self.key = key  # FTL key
         self.casefold = casefold
-        self.values: frozenset[str] = frozenset()  # FTL values
-        self._is_initiated: bool = False
-
-    def startup(self, i18n: I18nContext) -> None:
-        if self._is_initiated:
-            return
-
-        self.values = frozenset(
-            {i18n.core.get(self.key, locale) for locale in i18n.core.available_locales},
-        )
+        LAZY_FILTER_INDEX.register(self)
 
-        if self.casefold:
-            self.values = frozenset({value.casefold() for value in self.values})
+    async def __call__(
+        self,
+        event: Message,
+        i18n: I18nContext,
+        lazy_match: LazyMatch | None = None,
+    ) -> bool:
+        return (self.key, self.casefold) in _resolve_match(event, i18n, lazy_match)
 
-        self._is_initiated = True
 
-    async def __call__(self, event: Message, i18n: I18nContext) -> bool:
-        self.startup(
-            i18n,
-        )  # Temporary solution, because of https://github.com/aiogram/i18n/issues/38
-
-        if not (text := (event.text or event.caption)):
-            return False
+class AnyLazyFilter(Filter):
+    """
+    Router-level prefilter, passes if the text matched any `LazyFilter`.
 
-        if self.casefold:
-            text = text.casefold()
+    Set it on a router whose message handlers are all triggered by `LazyFilter`s, so texts that
+    match none of them skip the router before any of its handlers is checked.
+    """
 
-        return text in self.values
+    async def __call__(
+        self,
+        event: Message,
+        i18n: I18nContext,
+        lazy_match: LazyMatch | None = None,
+    ) -> bool:
+        return bool(_resolve_match(event, i18n, lazy_match))
 
 
 LF: type[LazyFilter] = LazyFilter
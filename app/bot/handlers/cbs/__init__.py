@@ -1,10 +1,11 @@
 from aiogram import Router
 
-from . import language_settings, start, universal_close
+from . import language_settings, outdated, start, universal_close
 
 router = Router()
 router.include_routers(
     language_settings.router,
     start.router,
     universal_close.router,
+    outdated.router,  # Must be the last one
 )
@@ -1,28 +1,25 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, cast
-
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from typing import TYPE_CHECKING
 
 from utils.callback_datas import PossibleLanguages, SelectLanguageCB
+from utils.locale_cache import KEYBOARD_CACHE
 
 if TYPE_CHECKING:
     from stub import I18nContext
+    from utils.locale_cache import KeyboardRows
 
 
-def select_language_keyboard(i18n: I18nContext) -> InlineKeyboardMarkup:
-    builder = InlineKeyboardBuilder().row(
-        *[
-            InlineKeyboardButton(
-                text=i18n.settings.select_language.code(
-                    language_code=language.value,
-                    _path="cmds/user_settings.ftl",
-                ),
-                callback_data=SelectLanguageCB(language=language).pack(),
-            )
-            for language in PossibleLanguages
-        ],
-        width=2,
-    )
-    return cast(InlineKeyboardMarkup, builder.as_markup())
+@KEYBOARD_CACHE.register
+def select_language_keyboard(i18n: I18nContext) -> KeyboardRows:
+    buttons = [
+        (
+            i18n.settings.select_language.code(
+                language_code=language.value,
+                _path="cmds/user_settings.ftl",
+            ),
+            SelectLanguageCB.template(language=language),
+        )
+        for language in PossibleLanguages
+    ]
+    return [buttons[i : i + 2] for i in range(0, len(buttons), 2)]
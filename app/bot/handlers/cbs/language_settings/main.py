@@ -7,7 +7,7 @@
 from sqlalchemy import update
 from sqlalchemy.sql.operators import eq
 
-from filters.cb_click_by_user import CallbackClickedByRedisUser, MsgOwner
+from filters.cb_click_by_user import CallbackClickedBySignedOwner
 from handlers.cbs.language_settings.keyboards import select_language_keyboard
 from handlers.cbs.start import GOTOStartCB
 from storages.psql.user import UserSettingsModel
@@ -24,26 +24,15 @@
 router = Router()
 
 
-@router.callback_query(LanguageWindowCB.filter(), CallbackClickedByRedisUser())
-async def language_window_cb(
-    cb: CallbackQuery,
-    i18n: I18nContext,
-    redis: Redis,
-) -> None:
+@router.callback_query(LanguageWindowCB.filter(), CallbackClickedBySignedOwner())
+async def language_window_cb(cb: CallbackQuery, i18n: I18nContext) -> None:
     await cb.message.edit_text(
         i18n.settings.select_language.text(_path="cmds/user_settings.ftl"),
-        reply_markup=select_language_keyboard(i18n),
-    )
-
-    await MsgOwner.set(
-        redis=redis,
-        chat_id=cb.message.chat.id,
-        message_id=cb.message.message_id,
-        owner_id=cb.from_user.id,
+        reply_markup=select_language_keyboard(i18n, cb.from_user.id),
     )
 
 
-@router.callback_query(SelectLanguageCB.filter(), CallbackClickedByRedisUser())
+@router.callback_query(SelectLanguageCB.filter(), CallbackClickedBySignedOwner())
 async def language_selected_cb(
     cb: CallbackQuery,
     callback_data: SelectLanguageCB,
@@ -76,7 +65,7 @@ async def language_selected_cb(
                         text=i18n.settings.select_language.goto_start(
                             _path="cmds/user_settings.ftl",
                         ),
-                        callback_data=GOTOStartCB().pack(),
+                        callback_data=GOTOStartCB(owner_id=cb.from_user.id).pack(),
                     ),
                 ],
             ],
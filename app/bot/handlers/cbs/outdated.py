@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from aiogram import Router
+
+if TYPE_CHECKING:
+    from aiogram.types import CallbackQuery
+
+    from stub import I18nContext
+
+router = Router()
+
+
+@router.callback_query()
+async def outdated_cb(cb: CallbackQuery, i18n: I18nContext) -> None:
+    """Buttons no other handler matched, like ones sent before callback data was signed."""
+    await cb.answer(i18n.message.deprecated(), show_alert=True)
@@ -3,30 +3,23 @@
 from typing import TYPE_CHECKING
 
 from aiogram import Router
-from aiogram.filters.callback_data import CallbackData
 
-from filters.cb_click_by_user import CallbackClickedByRedisUser, MsgOwner
+from filters.cb_click_by_user import CallbackClickedBySignedOwner
 from utils.callback_data_prefix_enums import CallbackDataPrefix
+from utils.signed_callback_data import SignedOwnerCallbackData
 
 if TYPE_CHECKING:
     from aiogram.types import CallbackQuery
-    from redis.asyncio import Redis
 
     from stub import I18nContext
 
 router = Router()
 
 
-class UniversalWindowCloseCB(CallbackData, prefix=CallbackDataPrefix.universal_close):
+class UniversalWindowCloseCB(SignedOwnerCallbackData, prefix=CallbackDataPrefix.universal_close):
     pass
 
 
-@router.callback_query(UniversalWindowCloseCB.filter(), CallbackClickedByRedisUser())
-async def universal_close_cb(cb: CallbackQuery, i18n: I18nContext, redis: Redis) -> None:
+@router.callback_query(UniversalWindowCloseCB.filter(), CallbackClickedBySignedOwner())
+async def universal_close_cb(cb: CallbackQuery, i18n: I18nContext) -> None:
     await cb.message.edit_text(i18n.window.closed())
-
-    await MsgOwner.delete(
-        redis=redis,
-        chat_id=cb.message.chat.id,
-        message_id=cb.message.message_id,
-    )
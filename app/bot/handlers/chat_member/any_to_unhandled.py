@@ -1,21 +1,31 @@
 from __future__ import annotations
 
 import logging
-import uuid
 from typing import TYPE_CHECKING
 
-from aiogram import Bot, Router
+from aiogram import Router
+
+from utils.queued_logging import ERRORS_LOG
 
 if TYPE_CHECKING:
     from aiogram.types import ChatMemberUpdated
 
+    from utils.alert_digest import AlertDigest
+
 logger = logging.getLogger(__name__)
 router = Router()
+ERRORS_LOG.attach(logger)
 
 
 @router.chat_member()
-async def any_to_unhandled(chat_member: ChatMemberUpdated, bot: Bot, developer_id: int) -> None:
-    alert_id = uuid.uuid4()
+async def any_to_unhandled(chat_member: ChatMemberUpdated, alert_digest: AlertDigest) -> None:
+    alert = alert_digest.add(
+        f"chat_member {chat_member.old_chat_member.status} -> {chat_member.new_chat_member.status}",
+        f"{chat_member.old_chat_member!r} -> {chat_member.new_chat_member!r}\n"
+        f"user_id: {chat_member.new_chat_member.user.id}\n"
+        f"mention: {chat_member.new_chat_member.user.mention_html()}\n"
+        f"chat_id: {chat_member.chat.id}",
+    )
 
     logger.warning(
         "🚨 DETECTED ANY TO UNHANDLED\n"
@@ -26,17 +36,9 @@ async def any_to_unhandled(chat_member: ChatMemberUpdated, bot: Bot, developer_i
         "Chat id: %s\n",
         chat_member.old_chat_member,
         chat_member.new_chat_member,
-        alert_id,
+        alert.id,
         chat_member.new_chat_member.user.id,
         chat_member.new_chat_member.user.mention_html(),
         chat_member.chat.id,
-    )
-
-    await bot.send_message(
-        developer_id,
-        f"🚨 DETECTED ANY TO UNHANDLED:\n"
-        f"Alert id: {alert_id}\n"
-        f"user_id: {chat_member.new_chat_member.user.id}\n"
-        f"mention: {chat_member.new_chat_member.user.mention_html()}\n"
-        "Details in /logs",
+        extra={"sample_key": alert.signature},
     )
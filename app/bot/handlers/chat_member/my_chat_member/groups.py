@@ -1,8 +1,6 @@
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
-from secrets import randbelow
 from typing import TYPE_CHECKING
 
 from aiogram import Bot, F, Router
@@ -44,7 +42,7 @@ async def my_chat_member_promoted_transition(
         chat_member=chat_member.new_chat_member,
     )
 
-    await bot_model.save(redis, timedelta(minutes=45 + randbelow(75 - 45 + 1)))
+    await bot_model.save(redis, bot_model.ttl_policy())
 
     logger.info("Bot was promoted in chat %s", chat_member.chat.id)
 
@@ -72,7 +70,7 @@ async def my_chat_member_administrator_transition(
         chat_member=chat_member.new_chat_member,
     )
 
-    await bot_model.save(redis, timedelta(minutes=45 + randbelow(75 - 45 + 1)))
+    await bot_model.save(redis, bot_model.ttl_policy())
 
     logger.info("Bot admin rights was changed in chat %s", chat_member.chat.id)
 
@@ -92,7 +90,7 @@ async def my_chat_member_join_transition(
         chat_member=chat_member.new_chat_member,
     )
 
-    await bot_model.save(redis, timedelta(minutes=45 + randbelow(75 - 45 + 1)))
+    await bot_model.save(redis, bot_model.ttl_policy())
 
     logger.info("Bot was added to chat %s", chat_member.chat.id)
 
@@ -120,7 +118,7 @@ async def my_chat_member_unrestricted_transition(
         chat_member=chat_member.new_chat_member,
     )
 
-    await bot_model.save(redis, timedelta(minutes=45 + randbelow(75 - 45 + 1)))
+    await bot_model.save(redis, bot_model.ttl_policy())
 
     logger.info("Bot was un/restricted in chat %s", chat_member.chat.id)
 
@@ -140,7 +138,7 @@ async def my_chat_member_demoted_transition(
         chat_member=chat_member.new_chat_member,
     )
 
-    await bot_model.save(redis, timedelta(minutes=45 + randbelow(75 - 45 + 1)))
+    await bot_model.save(redis, bot_model.ttl_policy())
 
     logger.info("Bot was demoted in chat %s", chat_member.chat.id)
 
@@ -159,6 +157,6 @@ async def my_chat_member_leave_transition(chat_member: ChatMemberUpdated, redis:
         chat_id=chat_member.chat.id,
         chat_member=chat_member.new_chat_member,
     )
-    await bot_model.save(redis, timedelta(minutes=45 + randbelow(75 - 45 + 1)))
+    await bot_model.save(redis, bot_model.ttl_policy())
 
     logger.info("Bot was kicked from chat %s", chat_member.chat.id)
@@ -5,6 +5,7 @@
 
 from aiogram import F, Router
 
+from filters.cb_click_by_user import MsgMultipleOwners, MsgOwner
 from storages.psql import ChatModel
 from storages.redis.chat import ChatModelRD, ChatSettingsModelRD
 
@@ -34,3 +35,7 @@ async def chat_migrate(
 
         await ChatModelRD.delete(redis, cast(int, msg.migrate_from_chat_id))
         await ChatSettingsModelRD.delete(redis, cast(int, msg.migrate_from_chat_id))
+
+        # Windows of the old chat can't be clicked anymore
+        await MsgOwner.delete_for_chat(redis, cast(int, msg.migrate_from_chat_id))
+        await MsgMultipleOwners.delete_for_chat(redis, cast(int, msg.migrate_from_chat_id))
@@ -1,9 +1,10 @@
 from aiogram import Router
 
-from . import language_settings, start
+from . import admin, language_settings, start
 
 router = Router()
 router.include_routers(
+    admin.router,
     language_settings.router,
     start.router,
 )
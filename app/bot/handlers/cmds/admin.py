@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import logging
+import traceback
+from html import escape
+from typing import TYPE_CHECKING, Final
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+
+from filters.is_developer import IsDeveloper
+from utils.locale_cache import reload_locales
+from utils.tracing import TRACER
+
+if TYPE_CHECKING:
+    from aiogram.types import Message
+    from aiogram_i18n import I18nMiddleware
+
+    from utils.alert_digest import AlertDigest
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+RECENT_ALERTS: Final[int] = 10
+SLOWEST_TRACES: Final[int] = 10
+
+
+@router.message(Command("reload_locales"), IsDeveloper())
+async def reload_locales_cmd(
+    msg: Message, i18n_middleware: I18nMiddleware, alert_digest: AlertDigest
+) -> None:
+    try:
+        await reload_locales(i18n_middleware)
+
+    except Exception:
+        logger.exception("Can't reload locales")
+        alert = alert_digest.add("Can't reload locales", traceback.format_exc())
+        await msg.answer(f"❌ Can't reload locales, details: /alerts {alert.id}")
+        return
+
+    await msg.answer(f"✅ Locales reloaded: {', '.join(i18n_middleware.core.available_locales)}")
+
+
+@router.message(Command("alerts"), IsDeveloper())
+async def alerts_cmd(msg: Message, command: CommandObject, alert_digest: AlertDigest) -> None:
+    if command.args:
+        if not (alert := alert_digest.find(command.args.strip())):
+            await msg.answer("🤷‍♂️ Alert not found, it may have left the buffer")
+            return
+
+        await msg.answer(
+            f"🚨 <b>{escape(alert.signature)}</b>\n"
+            f"Alert id: <code>{alert.id}</code>\n"
+            f"Time: {alert.created_at:%Y-%m-%d %H:%M:%S} UTC\n\n"
+            f"{escape(alert.details[:3500])}",
+        )
+        return
+
+    if not alert_digest.alerts:
+        await msg.answer("✅ No alerts")
+        return
+
+    recent = list(alert_digest.alerts)[-RECENT_ALERTS:]
+    await msg.answer(
+        "\n".join(
+            f"<code>{alert.id}</code> {alert.created_at:%H:%M:%S} {escape(alert.signature)}"
+            for alert in reversed(recent)
+        ),
+    )
+
+
+@router.message(Command("traces"), IsDeveloper())
+async def traces_cmd(msg: Message, command: CommandObject) -> None:
+    if command.args:
+        if not command.args.strip().isdigit() or not (
+            trace := TRACER.find(int(command.args.strip()))
+        ):
+            await msg.answer("🤷‍♂️ Trace not found, it may have left the buffer")
+            return
+
+        lines = "\n".join(TRACER.render(trace))
+        await msg.answer(
+            f"🐢 Update <code>{trace.update_id}</code>, "
+            f"{trace.created_at:%Y-%m-%d %H:%M:%S} UTC, start and duration in ms\n"
+            f"<pre>{escape(lines[:3500])}</pre>",
+        )
+        return
+
+    if not TRACER.traces:
+        await msg.answer(f"✅ No updates slower than {TRACER.threshold}s")
+        return
+
+    await msg.answer(
+        "\n".join(
+            f"<code>{trace.update_id}</code> {trace.root.duration:.0f} ms {escape(trace.root.name)}"
+            for trace in TRACER.slowest(SLOWEST_TRACES)
+        )
+        + "\nDetails: /traces &lt;update id&gt;",
+    )
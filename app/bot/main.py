@@ -2,6 +2,7 @@
 
 import asyncio
 import logging
+from datetime import timedelta
 from functools import partial
 from pathlib import Path
 from typing import TYPE_CHECKING, cast
@@ -10,7 +11,7 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.client.session.aiohttp import AiohttpSession
-from aiogram.client.telegram import PRODUCTION, TEST
+from aiogram.client.telegram import PRODUCTION, TEST, TelegramAPIServer
 from aiogram.fsm.storage.base import DefaultKeyBuilder
 from aiogram.fsm.storage.memory import SimpleEventIsolation
 from aiogram.fsm.storage.redis import RedisStorage
@@ -21,20 +22,48 @@
 )
 from aiogram.webhook.security import DEFAULT_TELEGRAM_NETWORKS, IPFilter
 from aiogram_i18n import I18nMiddleware
-from aiogram_i18n.cores import FluentRuntimeCore
 from aiohttp import web
 from aiohttp.typedefs import Middleware
 
 import errors
 import handlers
+from errors.errors import ERROR_COUNTERS
 from middlewares.check_chat_middleware import CheckChatMiddleware
 from middlewares.check_user_middleware import CheckUserMiddleware
-from middlewares.throttling_middleware import ThrottlingMiddleware
+from middlewares.lazy_filter_middleware import LazyFilterMiddleware
+from middlewares.metrics_middleware import (
+    HandlerMetricsMiddleware,
+    TimedMiddleware,
+    UpdateMetricsMiddleware,
+)
+from middlewares.outbound_scheduler_middleware import (
+    InteractivePriorityMiddleware,
+    OutboundSchedulerMiddleware,
+)
+from middlewares.redis_prefetch_middleware import RedisPrefetchMiddleware
+from middlewares.throttling_middleware import Throttler, ThrottlingMiddleware
+from middlewares.tracing_middleware import TracingMiddleware, TracingRequestMiddleware
 from settings import Settings
 from storages.psql.base import close_db_pool, create_db_pool
+from storages.psql.user.activity_buffer import UserActivityBuffer
+from storages.redis.key_schema import KEY_SCHEMA
+from storages.redis.l1_cache import L1_CACHE
+from storages.redis.traced import TracedRedis
+from utils.alert_digest import AlertDigest
 from utils.fsm_manager import FSMManager
+from utils.locale_cache import (
+    CachedFluentRuntimeCore,
+    build_locale_caches,
+    reload_locales_on_signal,
+)
+from utils.metrics import METRICS
+from utils.outbound_scheduler import OutboundScheduler
+from utils.queued_logging import ERRORS_LOG
+from utils.signed_callback_data import CALLBACK_SIGNER
+from utils.tracing import TRACER, TRACES_LOG
 
 if TYPE_CHECKING:
+    from aiogram.client.session.base import BaseSession
     from redis.asyncio import Redis
 
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +71,42 @@
 logger = logging.getLogger()
 
 
+def setup_metrics(dispatcher: Dispatcher) -> None:
+    """Register gauges of the services, read on every scrape."""
+    outbound_scheduler: OutboundScheduler = dispatcher["outbound_scheduler"]
+    alert_digest: AlertDigest = dispatcher["alert_digest"]
+
+    METRICS.gauge(
+        "outbound_queue_depth",
+        "Bot API calls waiting for the outbound scheduler",
+        lambda: {
+            (priority.name.lower(),): depth
+            for priority, depth in outbound_scheduler.queue_depth_by_priority().items()
+        },
+        ("priority",),
+    )
+    METRICS.gauge(
+        "telegram_errors",
+        "Resolved Telegram API errors",
+        lambda: {(name,): count for name, count in ERROR_COUNTERS.items()},
+        ("error",),
+        kind="counter",
+    )
+    METRICS.gauge(
+        "error_log_records_lost",
+        "Error log records dropped by the full queue or suppressed as duplicates",
+        lambda: {
+            ("dropped",): ERRORS_LOG.handler.dropped,
+            ("suppressed",): ERRORS_LOG.sampler.suppressed_total,
+        },
+        ("reason",),
+        kind="counter",
+    )
+    METRICS.gauge(
+        "alerts_buffered", "Alerts kept for `/alerts`", lambda: {(): len(alert_digest.alerts)}
+    )
+
+
 async def startup(dispatcher: Dispatcher, bot: Bot, settings: Settings, redis: Redis) -> None:
     await bot.delete_webhook(drop_pending_updates=True)
 
@@ -53,48 +118,101 @@ async def startup(dispatcher: Dispatcher, bot: Bot, settings: Settings, redis: R
         )
 
     engine, db_pool = await create_db_pool(settings)
+    user_activity = UserActivityBuffer(db_pool)
+    alert_digest = AlertDigest(bot, settings.developer_id)
 
     dispatcher.workflow_data.update(
-        {"db_pool": db_pool, "db_pool_closer": partial(close_db_pool, engine)},
+        {
+            "db_pool": db_pool,
+            "db_pool_closer": partial(close_db_pool, engine),
+            "user_activity": user_activity,
+            "alert_digest": alert_digest,
+        },
     )
 
-    dispatcher.message.middleware(ThrottlingMiddleware(redis))
-    dispatcher.callback_query.middleware(ThrottlingMiddleware(redis))
+    ERRORS_LOG.start()
+    TRACES_LOG.start()
+    await L1_CACHE.start(redis)
+    await user_activity.start()
+    await alert_digest.start()
+
+    dispatcher.update.outer_middleware(UpdateMetricsMiddleware())  # Before ours, times all of them
+    dispatcher.update.outer_middleware(TracingMiddleware())
+
+    dispatcher.message.outer_middleware(InteractivePriorityMiddleware())
+    dispatcher.callback_query.outer_middleware(InteractivePriorityMiddleware())
 
-    dispatcher.update.outer_middleware(CheckChatMiddleware())
-    dispatcher.update.outer_middleware(CheckUserMiddleware())
+    throttler = Throttler(redis, 4, timedelta(seconds=7))
+    dispatcher.message.middleware(TimedMiddleware(ThrottlingMiddleware(throttler)))
+    dispatcher.callback_query.middleware(TimedMiddleware(ThrottlingMiddleware(throttler)))
+
+    dispatcher.update.outer_middleware(TimedMiddleware(RedisPrefetchMiddleware()))
+    dispatcher.update.outer_middleware(TimedMiddleware(CheckChatMiddleware()))
+    dispatcher.update.outer_middleware(TimedMiddleware(CheckUserMiddleware(user_activity)))
+    dispatcher.message.outer_middleware(TimedMiddleware(LazyFilterMiddleware()))
 
     i18n_middleware = I18nMiddleware(
-        core=FluentRuntimeCore(path=Path(__file__).parent / "locales" / "{locale}"),
+        core=CachedFluentRuntimeCore(path=Path(__file__).parent / "locales" / "{locale}"),
         manager=FSMManager(),
     )
     i18n_middleware.setup(dispatcher=dispatcher)
+    # `setup` registers the middleware itself, replace it with the timed one
+    dispatcher.update.outer_middleware.unregister(i18n_middleware)
+    dispatcher.update.outer_middleware(TimedMiddleware(i18n_middleware))
+
+    for event_name, observer in dispatcher.observers.items():
+        if event_name not in {"update", "error"}:
+            observer.middleware(HandlerMetricsMiddleware(event_name))
+
     await i18n_middleware.core.startup()
+    build_locale_caches(i18n_middleware)
+    reload_locales_on_signal(i18n_middleware)
+
+    if settings.metrics_port:
+        setup_metrics(dispatcher)
+        dispatcher["metrics_runner"] = await METRICS.serve(
+            settings.metrics_host, settings.metrics_port
+        )
 
     logger.info("Bot started")
 
 
 async def shutdown(dispatcher: Dispatcher) -> None:
+    if (metrics_runner := dispatcher.get("metrics_runner")) is not None:
+        await metrics_runner.cleanup()
+    await dispatcher["alert_digest"].stop()  # Sends the last digest
+    await dispatcher["outbound_scheduler"].close()
+    await L1_CACHE.stop()
+    await dispatcher["user_activity"].stop()
     await dispatcher["db_pool_closer"]()
+    TRACES_LOG.stop()
+    ERRORS_LOG.stop()
     logger.info("Bot stopped")
 
 
-async def main() -> None:
-    settings = Settings()
-
-    # TelegramLocalBotAPIServer
-    # api = TelegramAPIServer.from_base("http://telegram-bot-api:8081")
-    # api = TelegramAPIServer.from_base("http://localhost:8081")
-    api = TEST if settings.test_server is True else PRODUCTION
+def create_bot(settings: Settings, session: BaseSession | None = None) -> Bot:
+    """Bot with the outbound middlewares, `session` replaces the Bot API one (benchmarks)."""
+    if session is None:
+        if settings.bot_api_url:
+            api = TelegramAPIServer.from_base(settings.bot_api_url)
+        else:
+            api = TEST if settings.test_server is True else PRODUCTION
+        session = AiohttpSession(api=api)
 
-    bot = Bot(
+    return Bot(
         token=settings.bot_token.get_secret_value(),
-        session=AiohttpSession(api=api),
+        session=session,
         default=DefaultBotProperties(parse_mode="HTML"),
     )
 
+
+def create_dispatcher(settings: Settings, bot: Bot, redis: Redis) -> Dispatcher:
+    outbound_scheduler = OutboundScheduler()
+    bot.session.middleware(TracingRequestMiddleware())
+    bot.session.middleware(OutboundSchedulerMiddleware(outbound_scheduler))
+
     storage = RedisStorage(
-        redis=await settings.redis_dsn(),
+        redis=redis,
         key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
         json_loads=msgspec.json.decode,
         json_dumps=partial(lambda obj: str(msgspec.json.encode(obj), encoding="utf-8")),
@@ -106,10 +224,29 @@ async def main() -> None:
         settings=settings,
         redis=storage.redis,
         developer_id=settings.developer_id,
+        outbound_scheduler=outbound_scheduler,
     )
     dp.include_routers(handlers.router, errors.router)
     dp.startup.register(startup)
     dp.shutdown.register(shutdown)
+    return dp
+
+
+def configure(settings: Settings) -> None:
+    KEY_SCHEMA.configure(
+        compact=settings.redis.compact_keys,
+        legacy_reads=settings.redis.legacy_key_reads,
+    )
+    CALLBACK_SIGNER.configure(settings.bot_token.get_secret_value())
+    TRACER.configure(settings.trace_threshold)
+
+
+async def main() -> None:
+    settings = Settings()
+    configure(settings)
+
+    bot = create_bot(settings)
+    dp = create_dispatcher(settings, bot, await settings.redis_dsn(TracedRedis))
 
     if settings.webhooks:
         app = web.Application(
@@ -1,111 +1,139 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, cast
+from functools import partial
+from typing import TYPE_CHECKING, Any, Final, cast
 
 from aiogram import BaseMiddleware
 from aiogram.enums import ChatType
-from sqlalchemy import select, update
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import BigInteger, Select, literal, select, update
+from sqlalchemy.dialects.postgresql import CITEXT, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql.operators import eq, ne
 
 from storages.psql.chat import ChatModel, ChatSettingsModel
+from storages.redis.batch import RedisBatch
 from storages.redis.chat import ChatModelRD, ChatSettingsModelRD
+from utils.single_flight import SingleFlight
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
 
     from aiogram.types import Chat, TelegramObject, Update
     from redis.asyncio.client import Redis
+    from sqlalchemy import Update as UpdateStmt
     from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 ALLOWED_CHAT_TYPES: frozenset[ChatType] = frozenset(
     (ChatType.GROUP, ChatType.SUPERGROUP),
 )
-
-
-async def _create_chat(chat: Chat, session: AsyncSession) -> ChatModel:
-    if chat.username:
-        stmt = select(ChatModel).where(
-            eq(ChatModel.username, chat.username), ne(ChatModel.id, chat.id)
+CHAT_EVENT_TYPES: frozenset[str] = frozenset(
+    ("message", "callback_query", "my_chat_member", "chat_member"),
+)
+CHAT_LOADS: Final[SingleFlight[int, tuple[ChatModelRD, ChatSettingsModelRD]]] = SingleFlight("chat")
+
+
+def plan_chat_models(event: Update, data: dict[str, Any], batch: RedisBatch) -> None:
+    """Add Redis keys that `CheckChatMiddleware` will read for this update to `batch`."""
+    chat: Chat | None = data.get("event_chat")
+
+    if chat and chat.type in ALLOWED_CHAT_TYPES and event.event_type in CHAT_EVENT_TYPES:
+        batch.add(ChatModelRD, chat.id).add(ChatSettingsModelRD, chat.id)
+
+
+def _free_username_stmt(chat: Chat) -> UpdateStmt:
+    """Build a statement that frees `chat.username` if another chat still holds it."""
+    return (
+        update(ChatModel)
+        .where(eq(ChatModel.username, chat.username), ne(ChatModel.id, chat.id))
+        .values(username=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _upsert_chat_stmt(chat: Chat, member_count: int) -> Select[tuple[ChatModel, ChatSettingsModel]]:
+    """Build one statement that upserts the chat row, upserts the settings row and returns both."""
+    source = select(
+        literal(chat.id, BigInteger),
+        literal(ChatType(chat.type), ChatModel.chat_type.type),
+        literal(chat.title),
+        literal(chat.username, CITEXT),
+        literal(member_count, BigInteger),
+    )
+
+    upserted_chat = (
+        insert(ChatModel)
+        .from_select(["id", "chat_type", "title", "username", "member_count"], source)
+        .on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                "chat_type": ChatType(chat.type),
+                "title": chat.title,
+                "username": chat.username,
+                "member_count": member_count,
+            },
         )
-        another_chat: ChatModel | None = await session.scalar(stmt)
-
-        if another_chat:
-            stmt = update(ChatModel).where(eq(ChatModel.id, another_chat.id)).values(username=None)
-            await session.execute(stmt)
-
-    stmt = select(ChatModel).where(eq(ChatModel.id, chat.id))
-    chat_model: ChatModel | None = await session.scalar(stmt)
-
-    if not chat_model:
-        stmt = (
-            insert(ChatModel)
-            .values(
-                id=chat.id,
-                chat_type=ChatType(chat.type),
-                title=chat.title,
-                username=chat.username,
-                member_count=(member_count := await chat.get_member_count()),
-            )
-            .on_conflict_do_update(
-                index_elements=["id"],
-                set_={
-                    "chat_type": ChatType(chat.type),
-                    "title": chat.title,
-                    "username": chat.username,
-                    "member_count": member_count,
-                },
-            )
-            .returning(ChatModel)
+        .returning(*ChatModel.__table__.columns)
+        .cte("upserted_chat")
+    )
+    upserted_settings = (
+        insert(ChatSettingsModel)
+        .from_select(["id", "language_code"], select(upserted_chat.c.id, literal("en")))
+        .on_conflict_do_update(
+            index_elements=["id"], set_={"language_code": ChatSettingsModel.language_code}
         )
-        chat_model = await session.scalar(stmt)
-
-    else:
-        chat_model.title = chat.title
-        chat_model.username = chat.username
-        chat_model.member_count = await chat.get_member_count()
+        .returning(*ChatSettingsModel.__table__.columns)
+        .cte("upserted_settings")
+    )
 
-    return cast(ChatModel, chat_model)
+    return select(aliased(ChatModel, upserted_chat), aliased(ChatSettingsModel, upserted_settings))
 
 
-async def _create_chat_settings(
-    chat_id: int,
+async def _upsert_chat(
     session: AsyncSession,
-) -> ChatSettingsModel:
-    stmt = select(ChatSettingsModel).where(eq(ChatSettingsModel.id, chat_id))
-    chat_settings_model: ChatSettingsModel | None = await session.scalar(stmt)
-
-    if not chat_settings_model:
-        stmt = (
-            insert(ChatSettingsModel)
-            .values(id=chat_id, language_code="en")
-            .returning(ChatSettingsModel)
-        )
-        chat_settings_model = await session.scalar(stmt)
-
-    return cast(ChatSettingsModel, chat_settings_model)
-
-
-async def _get_chat_model(
+    chat: Chat,
+    member_count: int,
+    *,
+    free_username: bool = False,
+) -> tuple[ChatModel, ChatSettingsModel]:
+    async with session.begin():
+        if free_username:
+            # Separately, so the username is free before the upsert checks the unique index
+            await session.execute(_free_username_stmt(chat))
+        result = await session.execute(_upsert_chat_stmt(chat, member_count))
+        return result.tuples().one()
+
+
+async def _load_chat_model(
     db_pool: async_sessionmaker[AsyncSession],
     redis: Redis,
     chat: Chat,
 ) -> tuple[ChatModelRD, ChatSettingsModelRD]:
-    chat_model: ChatModelRD | None = await ChatModelRD.get(redis, chat.id)
-    chat_settings: ChatSettingsModelRD | None = await ChatSettingsModelRD.get(redis, chat.id)
+    # Another worker may have loaded the chat while this one was waiting for the lock
+    batch = (
+        await RedisBatch().add(ChatModelRD, chat.id).add(ChatSettingsModelRD, chat.id).load(redis)
+    )
+
+    chat_model: ChatModelRD | None = batch.get(ChatModelRD, chat.id)
+    chat_settings: ChatSettingsModelRD | None = batch.get(ChatSettingsModelRD, chat.id)
 
     if chat_model and chat_settings:
         return chat_model, chat_settings
 
+    member_count = await chat.get_member_count()
+
     async with db_pool() as session:
-        async with session.begin():
-            chat_model: ChatModel = await _create_chat(chat=chat, session=session)
-            chat_settings: ChatSettingsModel = await _create_chat_settings(
-                chat_id=chat.id, session=session
+        try:
+            chat_model, chat_settings = await _upsert_chat(session, chat, member_count)
+        except IntegrityError:
+            # Another chat still holds the username, free it first. That takes another
+            # statement, so it's only done after the upsert failed instead of on every upsert
+            if not chat.username:
+                raise
+            chat_model, chat_settings = await _upsert_chat(
+                session, chat, member_count, free_username=True
             )
 
-            await session.commit()
-
         chat_model = ChatModelRD.from_orm(cast(ChatModel, chat_model))
         chat_settings = ChatSettingsModelRD.from_orm(cast(ChatSettingsModel, chat_settings))
 
@@ -115,6 +143,25 @@ async def _get_chat_model(
     return chat_model, chat_settings
 
 
+async def _get_chat_model(
+    db_pool: async_sessionmaker[AsyncSession],
+    redis: Redis,
+    batch: RedisBatch,
+    chat: Chat,
+) -> tuple[ChatModelRD, ChatSettingsModelRD]:
+    await batch.add(ChatModelRD, chat.id).add(ChatSettingsModelRD, chat.id).load(redis)
+
+    chat_model: ChatModelRD | None = batch.get(ChatModelRD, chat.id)
+    chat_settings: ChatSettingsModelRD | None = batch.get(ChatSettingsModelRD, chat.id)
+
+    if chat_model and chat_settings:
+        return chat_model, chat_settings
+
+    return await CHAT_LOADS.do(
+        chat.id, partial(_load_chat_model, db_pool=db_pool, redis=redis, chat=chat), redis=redis
+    )
+
+
 class CheckChatMiddleware(BaseMiddleware):
     async def __call__(
         self,
@@ -143,6 +190,7 @@ async def __call__(
                     data["chat_model"], data["chat_settings"] = await _get_chat_model(
                         db_pool=data["db_pool"],
                         redis=data["redis"],
+                        batch=data.setdefault("redis_batch", RedisBatch()),
                         chat=chat,
                     )
 
@@ -151,6 +199,7 @@ async def __call__(
                     data["chat_model"], data["chat_settings"] = await _get_chat_model(
                         db_pool=data["db_pool"],
                         redis=data["redis"],
+                        batch=data.setdefault("redis_batch", RedisBatch()),
                         chat=chat,
                     )
 
@@ -1,107 +1,159 @@
 from __future__ import annotations
 
 from datetime import UTC, datetime
+from functools import partial
 from typing import TYPE_CHECKING, Any, Final, cast
 
+import msgspec
 from aiogram import BaseMiddleware
 from aiogram.enums import ChatType
 from aiogram.types import Chat, Message, TelegramObject, Update, User
-from sqlalchemy import select, update
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import BigInteger, Select, literal, select, update
+from sqlalchemy.dialects.postgresql import CITEXT, TIMESTAMP, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql.operators import eq, ne
 
 from storages.psql.user import UserModel, UserSettingsModel
+from storages.redis.batch import RedisBatch
 from storages.redis.user import UserRD, UserSettingsRD
+from utils.single_flight import SingleFlight
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
 
     from redis.asyncio.client import Redis
+    from sqlalchemy import Update as UpdateStmt
     from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+    from storages.psql.user.activity_buffer import UserActivityBuffer
+
 # 777000 is Telegram's user id of service messages
 TG_SERVICE_USER_ID: Final[int] = 777000
+USER_EVENT_TYPES: frozenset[str] = frozenset(
+    ("message", "callback_query", "my_chat_member", "chat_member", "inline_query"),
+)
+USER_LOADS: Final[SingleFlight[int, tuple[UserRD, UserSettingsRD]]] = SingleFlight("user")
 
 
-async def _create_user(*, user: User, chat: Chat, session: AsyncSession) -> UserModel:
-    if user.username:
-        stmt = select(UserModel).where(
-            eq(UserModel.username, user.username), ne(UserModel.id, user.id)
-        )
-        another_user: UserModel = await session.scalar(stmt)
+def _is_regular_user(user: User | None) -> bool:
+    return user is not None and user.is_bot is False and user.id != TG_SERVICE_USER_ID
 
-        if another_user:
-            stmt = update(UserModel).where(eq(UserModel.id, another_user.id)).values(username=None)
-            await session.execute(stmt)
 
-    stmt = select(UserModel).where(eq(UserModel.id, user.id))
-    user_model: UserModel | None = await session.scalar(stmt)
+def _reply_user(event: Update) -> User | None:
+    msg: Message = cast(Message, event.event)
+
+    if msg.reply_to_message and _is_regular_user(msg.reply_to_message.from_user):
+        return msg.reply_to_message.from_user
+
+    return None
+
+
+def plan_user_models(event: Update, data: dict[str, Any], batch: RedisBatch) -> None:
+    """Add Redis keys that `CheckUserMiddleware` will read for this update to `batch`."""
+    if event.event_type not in USER_EVENT_TYPES:
+        return
+
+    user: User | None = data.get("event_from_user")
+    if _is_regular_user(user):
+        batch.add(UserRD, user.id).add(UserSettingsRD, user.id)
+
+    if event.event_type == "message" and (reply_user := _reply_user(event)):
+        batch.add(UserRD, reply_user.id).add(UserSettingsRD, reply_user.id)
 
-    if not user_model:
-        stmt = (
-            insert(UserModel)
-            .values(
-                id=user.id,
-                username=user.username,
-                first_name=user.first_name,
-                last_name=user.last_name,
-                pm_active=chat.type == ChatType.PRIVATE,
-            )
-            .on_conflict_do_update(
-                index_elements=["id"],
-                set_={
-                    "username": user.username,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "last_active": datetime.now(tz=UTC).replace(tzinfo=None),
-                },
-            )
-            .returning(UserModel)
-        )
-        user_model = await session.scalar(stmt)
 
-    else:
-        user_model.username = user.username
-        user_model.first_name = user.first_name
-        user_model.last_name = user.last_name
-        user_model.last_active = datetime.now(tz=UTC).replace(tzinfo=None)
+def _free_username_stmt(user: User) -> UpdateStmt:
+    """Build a statement that frees `user.username` if another user still holds it."""
+    return (
+        update(UserModel)
+        .where(eq(UserModel.username, user.username), ne(UserModel.id, user.id))
+        .values(username=None)
+        .execution_options(synchronize_session=False)
+    )
 
-    return cast(UserModel, user_model)
 
+def _upsert_user_stmt(user: User, chat: Chat) -> Select[tuple[UserModel, UserSettingsModel]]:
+    """Build one statement that upserts the user row, upserts the settings row and returns both."""
+    now = datetime.now(tz=UTC).replace(tzinfo=None)
+    source = select(
+        literal(user.id, BigInteger),
+        literal(user.username, CITEXT),
+        literal(user.first_name),
+        literal(user.last_name),
+        literal(chat.type == ChatType.PRIVATE),
+        literal(now, TIMESTAMP),
+    )
 
-async def _create_user_settings(*, user_id: int, session: AsyncSession) -> UserSettingsModel:
-    stmt = (
+    upserted_user = (
+        insert(UserModel)
+        .from_select(
+            ["id", "username", "first_name", "last_name", "pm_active", "last_active"], source
+        )
+        .on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                "username": user.username,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "last_active": now,
+            },
+        )
+        .returning(*UserModel.__table__.columns)
+        .cte("upserted_user")
+    )
+    upserted_settings = (
         insert(UserSettingsModel)
-        .values(id=user_id)
+        .from_select(["id"], select(upserted_user.c.id))
         .on_conflict_do_update(
             index_elements=["id"], set_={"language_code": UserSettingsModel.language_code}
         )
-        .returning(UserSettingsModel)
+        .returning(*UserSettingsModel.__table__.columns)
+        .cte("upserted_settings")
     )
-    return cast(UserSettingsModel, await session.scalar(stmt))
 
+    return select(aliased(UserModel, upserted_user), aliased(UserSettingsModel, upserted_settings))
 
-async def _get_user_model(
+
+async def _upsert_user(
+    session: AsyncSession,
+    user: User,
+    chat: Chat,
+    *,
+    free_username: bool = False,
+) -> tuple[UserModel, UserSettingsModel]:
+    async with session.begin():
+        if free_username:
+            # Separately, so the username is free before the upsert checks the unique index
+            await session.execute(_free_username_stmt(user))
+        result = await session.execute(_upsert_user_stmt(user, chat))
+        return result.tuples().one()
+
+
+async def _load_user_model(
     *,
     db_pool: async_sessionmaker[AsyncSession],
     redis: Redis,
     user: User,
     chat: Chat,
 ) -> tuple[UserRD, UserSettingsRD]:
-    user_model: UserRD | None = await UserRD.get(redis, user.id)
-    user_settings: UserSettingsRD | None = await UserSettingsRD.get(redis, user.id)
+    # Another worker may have loaded the user while this one was waiting for the lock
+    batch = await RedisBatch().add(UserRD, user.id).add(UserSettingsRD, user.id).load(redis)
+
+    user_model: UserRD | None = batch.get(UserRD, user.id)
+    user_settings: UserSettingsRD | None = batch.get(UserSettingsRD, user.id)
 
     if user_model and user_settings:
         return user_model, user_settings
 
     async with db_pool() as session:
-        async with session.begin():
-            user_model: UserModel = await _create_user(user=user, chat=chat, session=session)
-            user_settings: UserSettingsModel = await _create_user_settings(
-                user_id=user.id, session=session
-            )
-
-            await session.commit()
+        try:
+            user_model, user_settings = await _upsert_user(session, user, chat)
+        except IntegrityError:
+            # Another user still holds the username, free it first. That takes another
+            # statement, so it's only done after the upsert failed instead of on every upsert
+            if not user.username:
+                raise
+            user_model, user_settings = await _upsert_user(session, user, chat, free_username=True)
 
         user_model: UserRD = UserRD.from_orm(cast(UserModel, user_model))
         user_settings: UserSettingsRD = UserSettingsRD.from_orm(
@@ -114,7 +166,58 @@ async def _get_user_model(
     return cast(UserRD, user_model), cast(UserSettingsRD, user_settings)
 
 
+async def _get_user_model(
+    *,
+    db_pool: async_sessionmaker[AsyncSession],
+    redis: Redis,
+    batch: RedisBatch,
+    user: User,
+    chat: Chat,
+) -> tuple[UserRD, UserSettingsRD]:
+    await batch.add(UserRD, user.id).add(UserSettingsRD, user.id).load(redis)
+
+    user_model: UserRD | None = batch.get(UserRD, user.id)
+    user_settings: UserSettingsRD | None = batch.get(UserSettingsRD, user.id)
+
+    if user_model and user_settings:
+        return user_model, user_settings
+
+    return await USER_LOADS.do(
+        user.id,
+        partial(_load_user_model, db_pool=db_pool, redis=redis, user=user, chat=chat),
+        redis=redis,
+    )
+
+
+def _profile_changed(user_model: UserRD, user: User) -> bool:
+    return (user_model.username, user_model.first_name, user_model.last_name) != (
+        user.username,
+        user.first_name,
+        user.last_name,
+    )
+
+
 class CheckUserMiddleware(BaseMiddleware):
+    def __init__(self, activity: UserActivityBuffer | None = None) -> None:
+        self.activity = activity
+
+    async def _track_activity(self, user: User, data: dict[str, Any]) -> None:
+        """
+        Record activity for the write-behind buffer and refresh a cached profile that differs
+        from the event, so the same change isn't detected again on every update.
+        """
+        self.activity.touch(user)
+
+        user_model: UserRD = data["user_model"]
+        if _profile_changed(user_model, user):
+            data["user_model"] = msgspec.structs.replace(
+                user_model,
+                username=user.username,
+                first_name=user.first_name,
+                last_name=user.last_name,
+            )
+            await data["user_model"].save(data["redis"])
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
@@ -123,40 +226,37 @@ async def __call__(
     ) -> Any:
         chat: Chat = data["event_chat"]
         user: User = data["event_from_user"]
+        batch: RedisBatch = data.setdefault("redis_batch", RedisBatch())
 
         if TYPE_CHECKING:
             assert isinstance(event, Update)
 
         match event.event_type:
             case "message":
-                if user.is_bot is False and user.id != TG_SERVICE_USER_ID:
+                if _is_regular_user(user):
                     data["user_model"], data["user_settings"] = await _get_user_model(
                         db_pool=data["db_pool"],
                         redis=data["redis"],
+                        batch=batch,
                         user=user,
                         chat=chat,
                     )
 
-                msg: Message = cast(Message, event.event)
-
-                if (
-                    msg.reply_to_message
-                    and msg.reply_to_message.from_user
-                    and not msg.reply_to_message.from_user.is_bot
-                    and msg.reply_to_message.from_user.id != TG_SERVICE_USER_ID
-                ):
+                if reply_user := _reply_user(event):
                     data["reply_user_model"], data["reply_user_settings"] = await _get_user_model(
                         db_pool=data["db_pool"],
                         redis=data["redis"],
-                        user=msg.reply_to_message.from_user,
+                        batch=batch,
+                        user=reply_user,
                         chat=chat,
                     )
 
             case "callback_query" | "my_chat_member" | "chat_member" | "inline_query":
-                if user.is_bot is False and user.id != TG_SERVICE_USER_ID:
+                if _is_regular_user(user):
                     data["user_model"], data["user_settings"] = await _get_user_model(
                         db_pool=data["db_pool"],
                         redis=data["redis"],
+                        batch=batch,
                         user=user,
                         chat=chat,
                     )
@@ -164,4 +264,7 @@ async def __call__(
             case _:
                 pass
 
+        if self.activity is not None and "user_model" in data:
+            await self._track_activity(user, data)
+
         return await handler(event, data)
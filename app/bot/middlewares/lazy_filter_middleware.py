@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+
+from filters.lazy_filter import LAZY_FILTER_INDEX
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram.types import Message, TelegramObject
+
+
+class LazyFilterMiddleware(BaseMiddleware):
+    """
+    Matches the message text against all `LazyFilter`s with one lookup and passes the result
+    as `lazy_match`, so every `LazyFilter` on the way only checks its own key.
+
+    Register as an outer middleware of `message`, after `LAZY_FILTER_INDEX` is built.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if TYPE_CHECKING:
+            assert isinstance(event, Message)
+
+        if LAZY_FILTER_INDEX.is_built:
+            data["lazy_match"] = LAZY_FILTER_INDEX.match(event.text or event.caption)
+
+        return await handler(event, data)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+
+from utils.metrics import HANDLER_SECONDS, MIDDLEWARE_SECONDS, UPDATE_SECONDS
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram.dispatcher.event.handler import HandlerObject
+    from aiogram.types import TelegramObject, Update
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Times every update by its type, `bot_update_seconds_count` is the number of updates.
+
+    Register it as the first outer middleware of `update`, to time all the other ones.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if TYPE_CHECKING:
+            assert isinstance(event, Update)
+
+        with UPDATE_SECONDS.time(event.event_type):
+            return await handler(event, data)
+
+
+class TimedMiddleware(BaseMiddleware):
+    """
+    Wraps a middleware to time it, without the time spent in the handlers it calls.
+
+    It's also a trace span, with the rest of the chain nested in it.
+    """
+
+    def __init__(self, middleware: BaseMiddleware, name: str | None = None) -> None:
+        self.middleware = middleware
+        self.name = name or type(middleware).__name__
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        inner = 0.0
+
+        async def timed_handler(event: TelegramObject, data: dict[str, Any]) -> Any:
+            nonlocal inner
+            started = perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                inner += perf_counter() - started
+
+        started = perf_counter()
+        try:
+            with span(self.name):
+                return await self.middleware(timed_handler, event, data)
+        finally:
+            MIDDLEWARE_SECONDS.observe(perf_counter() - started - inner, self.name)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Times handlers, register as the last inner middleware of every observed event."""
+
+    def __init__(self, event_name: str) -> None:
+        self.event_name = event_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object: HandlerObject = data["handler"]
+        callback = handler_object.callback
+
+        name = f"{callback.__module__}.{callback.__qualname__}"
+        with HANDLER_SECONDS.time(self.event_name, name), span(name):
+            return await handler(event, data)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, Final
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from utils.outbound_scheduler import Priority, outbound_priority, use_priority
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+    from aiogram.methods.base import TelegramType
+    from aiogram.types import TelegramObject
+
+    from utils.outbound_scheduler import OutboundScheduler
+
+logger = logging.getLogger(__name__)
+
+# Methods that post a new message into a chat, only these count towards the message limits
+SCHEDULED_METHODS: Final[frozenset[str]] = frozenset(
+    {
+        "sendMessage",
+        "sendPhoto",
+        "sendAudio",
+        "sendDocument",
+        "sendVideo",
+        "sendAnimation",
+        "sendVoice",
+        "sendVideoNote",
+        "sendPaidMedia",
+        "sendMediaGroup",
+        "sendLocation",
+        "sendVenue",
+        "sendContact",
+        "sendPoll",
+        "sendDice",
+        "sendSticker",
+        "forwardMessage",
+        "forwardMessages",
+        "copyMessage",
+        "copyMessages",
+    },
+)
+DEFAULT_MAX_RETRIES: Final[int] = 3
+
+
+class OutboundSchedulerMiddleware(BaseRequestMiddleware):
+    """
+    Routes outgoing messages through `OutboundScheduler` and handles `retry_after` centrally.
+
+    Other methods (callback answers, edits, chat actions, ...) are sent right away, but a
+    `retry_after` on any of them still pauses the scheduler, and the request is retried through
+    the queue up to `max_retries` times. Messages wait in the lane of `outbound_priority`, see
+    `InteractivePriorityMiddleware`.
+    """
+
+    def __init__(
+        self, scheduler: OutboundScheduler, max_retries: int = DEFAULT_MAX_RETRIES
+    ) -> None:
+        self.scheduler = scheduler
+        self.max_retries = max_retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        scheduled = method.__api_method__ in SCHEDULED_METHODS
+        attempt = 0
+
+        while True:
+            if scheduled:
+                await self.scheduler.acquire(chat_id, outbound_priority.get())
+
+            try:
+                return await make_request(bot, method)
+
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+
+                attempt += 1
+                self.scheduler.pause(chat_id, e.retry_after)
+                logger.warning(
+                    "Flood control on %s in chat %s, retry %d in %d seconds",
+                    method.__api_method__,
+                    chat_id,
+                    attempt,
+                    e.retry_after,
+                )
+                scheduled = True  # Wait out the pause in the queue
+
+
+class InteractivePriorityMiddleware(BaseMiddleware):
+    """
+    Sends requests made while handling a message or a callback query through the high priority
+    lane, so replies and callback answers overtake broadcasts and background jobs.
+
+    Handlers opt out of it for bulk sends with `use_priority`.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        with use_priority(Priority.HIGH):
+            return await handler(event, data)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+
+from middlewares.check_chat_middleware import plan_chat_models
+from middlewares.check_user_middleware import plan_user_models
+from storages.redis.batch import RedisBatch
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram.types import TelegramObject, Update
+
+
+class RedisPrefetchMiddleware(BaseMiddleware):
+    """
+    Loads every Redis model `CheckChatMiddleware` and `CheckUserMiddleware` need for the update
+    (chat, chat settings, user, user settings, reply user) in one round-trip. Both middlewares
+    read from the shared `redis_batch` and only query Redis themselves on a cold miss.
+
+    Must be registered before them.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if TYPE_CHECKING:
+            assert isinstance(event, Update)
+
+        batch = RedisBatch()
+        plan_chat_models(event, data, batch)
+        plan_user_models(event, data, batch)
+
+        data["redis_batch"] = await batch.load(data["redis"])
+
+        return await handler(event, data)
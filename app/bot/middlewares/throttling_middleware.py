@@ -2,7 +2,9 @@
 
 from contextlib import suppress
 from datetime import timedelta
-from typing import TYPE_CHECKING, Any, Final, TypeVar
+from enum import IntEnum
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Final
 
 from aiogram import BaseMiddleware
 from aiogram.dispatcher.flags import get_flag
@@ -16,67 +18,187 @@
 )
 
 from errors.errors import MessageToReactNotFoundError
+from storages.redis.key_schema import KEY_SCHEMA, RedisKeyPrefix
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
 
     from redis.asyncio.client import Redis
-    from redis.typing import ExpiryT
 
 DEFAULT_RATE_LIMIT: Final[int] = 1000  # milliseconds cooldown
-KeyValueT = TypeVar("KeyValueT", bound=int | str)
 
+DEFAULT_LEASE_SIZE: Final[int] = 2  # max cells a worker may take from Redis at once
+DEFAULT_LOCAL_MAXSIZE: Final[int] = 100_000  # users tracked by the local fast path
+
+# KEYS[1] - cooldown key, KEYS[2] - GCRA key holding the theoretical arrival time (TAT) in ms
+# ARGV[1] - cooldown in ms, ARGV[2] - "1" to restart the cooldown when it is hit,
+# ARGV[3] - emission interval in ms, ARGV[4] - period in ms, ARGV[5] - cost in cells,
+# ARGV[6] - max cells to lease
+# Returns {verdict, remaining ttl of whatever throttled the update in ms, leased cells}
+THROTTLE_SCRIPT: Final[str] = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local cooldown = redis.call("PTTL", KEYS[1])
+if cooldown ~= -2 then
+    if ARGV[2] == "1" then
+        redis.call("SET", KEYS[1], ARGV[1], "PX", ARGV[1])
+        cooldown = tonumber(ARGV[1])
+    end
+    return {1, cooldown, 0}
+end
+
+redis.call("SET", KEYS[1], ARGV[1], "PX", ARGV[1])
+
+local interval = tonumber(ARGV[3])
+local period = tonumber(ARGV[4])
+local cost = tonumber(ARGV[5])
+local tat = math.max(tonumber(redis.call("GET", KEYS[2]) or now), now)
+local available = math.floor((now + period - tat) / interval)
+
+if available < cost then
+    return {2, tat + cost * interval - period - now, 0}
+end
+
+local leased = math.max(cost, math.min(tonumber(ARGV[6]), math.floor(available / 2)))
+tat = tat + leased * interval
+redis.call("SET", KEYS[2], tat, "PX", math.max(tat - now, 1))
+return {0, 0, leased}
+"""
+
+
+class ThrottleVerdict(IntEnum):
+    ALLOWED = 0
+    COOLDOWN = 1
+    BUCKET_EMPTY = 2
+
+
+class Throttler[KeyValueT: int | str = int]:
+    """
+    Per-user cooldown plus a GCRA (generic cell rate algorithm) limit of `limit` cells per
+    `period`, with a local fast path.
+
+    Redis is the source of truth: one server-side script checks the cooldown and takes cells
+    from the user's GCRA budget. It may lease more cells than the update costs, up to
+    `lease_size` and never more than half of what is left, so a worker spends the rest
+    locally without a round-trip. Close to the limit, leases shrink to the cost of a single
+    update and every update goes to Redis again. Verdicts that throttle an update are also
+    remembered locally until they expire, so repeated clicks don't reach Redis either.
+
+    The budget is exact across workers, because cells are only spent after Redis granted
+    them. The cooldown is exact within a worker and is checked across workers whenever a
+    worker goes to Redis. Cells spent from a lease don't set the cooldown in Redis, so
+    another worker may let through an update the cooldown should have throttled. That is
+    bounded by `lease_size - 1` updates per lease, each still paid for from the budget.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        limit: int,
+        period: timedelta,
+        lease_size: int = DEFAULT_LEASE_SIZE,
+        local_maxsize: int = DEFAULT_LOCAL_MAXSIZE,
+    ) -> None:
+        self.script = redis.register_script(THROTTLE_SCRIPT)
+        self.interval_ms = int(period.total_seconds() * 1000) // limit
+        self.period_ms = self.interval_ms * limit
+        self.lease_size = lease_size
+        self.local_maxsize = local_maxsize
+
+        # Local state, values are `time.monotonic()` deadlines
+        self._cooldowns: dict[tuple[KeyValueT, str], float] = {}
+        self._limited: dict[KeyValueT, float] = {}
+        self._leases: dict[KeyValueT, tuple[int, float]] = {}  # (cells, deadline)
 
-class TTLCache:
-    def __init__(self, redis: Redis) -> None:
-        self.redis = redis
+    @classmethod
+    def cooldown_key(cls, object_id: KeyValueT, throttle_key: str = "-") -> str:
+        return KEY_SCHEMA.key(cls.__name__, RedisKeyPrefix.throttler, "cd", object_id, throttle_key)
 
     @classmethod
-    def key(cls, object_id: KeyValueT, throttle_key: str = "-") -> str:
-        return f"{cls.__name__}:{object_id}:{throttle_key}"
+    def gcra_key(cls, object_id: KeyValueT) -> str:
+        return KEY_SCHEMA.key(cls.__name__, RedisKeyPrefix.throttler, "g", object_id)
 
-    async def get(self, key: KeyValueT, throttle_key: str = "-") -> bytes | None:
-        return await self.redis.get(self.key(key, throttle_key))
+    def _remember[K, V](self, mapping: dict[K, V], key: K, value: V) -> None:
+        mapping.pop(key, None)
+        mapping[key] = value
 
-    async def set(
-        self,
-        key: KeyValueT,
-        time_ms: ExpiryT,
-        value: Any,
-        throttle_key: str = "-",
-    ) -> bool:
-        return await self.redis.psetex(self.key(key, throttle_key), time_ms, value)
+        if len(mapping) > self.local_maxsize:
+            del mapping[next(iter(mapping))]
 
+    def _check_locally(
+        self,
+        object_id: KeyValueT,
+        time_ms: int,
+        throttle_key: str,
+        bucket_decrement: int,
+    ) -> tuple[ThrottleVerdict, int] | None:
+        now = monotonic()
+
+        if (deadline := self._cooldowns.get((object_id, throttle_key), 0)) > now:
+            if throttle_key == "-":
+                self._remember(self._cooldowns, (object_id, throttle_key), now + time_ms / 1000)
+                return ThrottleVerdict.COOLDOWN, time_ms
+            return ThrottleVerdict.COOLDOWN, int((deadline - now) * 1000)
 
-class LeakyBucket:
-    def __init__(self, redis: Redis, limit: int, period: timedelta) -> None:
-        self.redis = redis
-        self.limit = limit
-        self.period = period
+        if (deadline := self._limited.get(object_id, 0)) > now:
+            return ThrottleVerdict.BUCKET_EMPTY, int((deadline - now) * 1000)
 
-    @classmethod
-    def key(cls, object_id: KeyValueT) -> str:
-        return f"{cls.__name__}:{object_id}"
+        cells, deadline = self._leases.get(object_id, (0, 0))
+        if deadline > now and cells >= bucket_decrement:
+            self._leases[object_id] = (cells - bucket_decrement, deadline)
+            self._remember(self._cooldowns, (object_id, throttle_key), now + time_ms / 1000)
+            return ThrottleVerdict.ALLOWED, 0
 
-    async def is_limit_reached(self, object_id: KeyValueT, bucket_decrement: int = 1) -> bool:
-        key = self.key(object_id)
+        return None
 
-        if await self.redis.setnx(key, self.limit):
-            await self.redis.expire(key, int(self.period.total_seconds()))
+    async def check(
+        self,
+        object_id: KeyValueT,
+        time_ms: int,
+        throttle_key: str = "-",
+        bucket_decrement: int = 1,
+    ) -> tuple[ThrottleVerdict, int]:
+        if result := self._check_locally(object_id, time_ms, throttle_key, bucket_decrement):
+            return result
+
+        verdict, ttl, leased = await self.script(
+            keys=[self.cooldown_key(object_id, throttle_key), self.gcra_key(object_id)],
+            args=[
+                time_ms,
+                int(throttle_key == "-"),
+                self.interval_ms,
+                self.period_ms,
+                bucket_decrement,
+                self.lease_size,
+            ],
+        )
+        verdict = ThrottleVerdict(verdict)
+        now = monotonic()
+
+        match verdict:
+            case ThrottleVerdict.ALLOWED:
+                self._remember(self._cooldowns, (object_id, throttle_key), now + time_ms / 1000)
+                self._remember(
+                    self._leases,
+                    object_id,
+                    (leased - bucket_decrement, now + self.period_ms / 1000),
+                )
 
-        bucket_value = await self.redis.get(key) or 0
+            case ThrottleVerdict.COOLDOWN:
+                self._remember(self._cooldowns, (object_id, throttle_key), now + ttl / 1000)
 
-        if int(bucket_value) > 0:
-            await self.redis.decrby(key, bucket_decrement)
-            return False
+            case ThrottleVerdict.BUCKET_EMPTY:
+                self._remember(self._cooldowns, (object_id, throttle_key), now + time_ms / 1000)
+                self._remember(self._limited, object_id, now + ttl / 1000)
 
-        return True
+        return verdict, ttl
 
 
 class ThrottlingMiddleware(BaseMiddleware):
-    def __init__(self, redis: Redis) -> None:
-        self.ttl_cache = TTLCache(redis)
-        self.leaky_bucket = LeakyBucket(redis, 4, timedelta(seconds=7))
+    def __init__(self, throttler: Throttler[int]) -> None:
+        # Shared between observers, so a user has one bucket for messages and callbacks
+        self.throttler = throttler
 
     async def __call__(
         self,
@@ -96,40 +218,32 @@ async def __call__(
         if isinstance(throttle_time, timedelta):
             throttle_time = int(throttle_time.total_seconds() * 1000)  # Convert to milliseconds
 
-        if await self.ttl_cache.get(user.id, throttle_key):
-            match event:
-                case CallbackQuery():
-                    await event.answer("⏳ Too fast!", show_alert=True)
-                case Message():
-                    with suppress(MessageToReactNotFoundError):
-                        await event.react(reaction=[ReactionTypeEmoji(emoji="🤔")])
-                case _:
-                    pass
+        verdict, _ = await self.throttler.check(
+            user.id,
+            time_ms=throttle_time,
+            throttle_key=throttle_key,
+            bucket_decrement=bucket_decrement,
+        )
+
+        match verdict, event:
+            case ThrottleVerdict.ALLOWED, _:
+                return await handler(event, data)
 
-            if throttle_key == "-":
-                await self.ttl_cache.set(
-                    key=self.ttl_cache.key(user.id),
-                    time_ms=throttle_time,
-                    value=throttle_time,
-                    throttle_key=throttle_key,
-                )
+            case ThrottleVerdict.COOLDOWN, CallbackQuery():
+                await event.answer("⏳ Too fast!", show_alert=True)
 
-            return None
+            case ThrottleVerdict.COOLDOWN, Message():
+                with suppress(MessageToReactNotFoundError):
+                    await event.react(reaction=[ReactionTypeEmoji(emoji="🤔")])
 
-        await self.ttl_cache.set(
-            key=user.id, time_ms=throttle_time, value=throttle_time, throttle_key=throttle_key
-        )
+            case ThrottleVerdict.BUCKET_EMPTY, CallbackQuery():
+                await event.answer("🪣 Too fast!", show_alert=True)
 
-        if await self.leaky_bucket.is_limit_reached(user.id, bucket_decrement=bucket_decrement):
-            match event:
-                case CallbackQuery():
-                    await event.answer("🪣 Too fast!", show_alert=True)
-                case Message():
-                    with suppress(MessageToReactNotFoundError):
-                        await event.react(reaction=[ReactionTypeEmoji(emoji="🗿")])
-                case _:
-                    pass
+            case ThrottleVerdict.BUCKET_EMPTY, Message():
+                with suppress(MessageToReactNotFoundError):
+                    await event.react(reaction=[ReactionTypeEmoji(emoji="🗿")])
 
-            return None
+            case _:
+                pass
 
-        return await handler(event, data)
+        return None
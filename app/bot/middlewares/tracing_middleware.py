@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+from utils.metrics import BOT_API_REQUESTS
+from utils.tracing import TRACER, span
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+    from aiogram.methods.base import TelegramType
+    from aiogram.types import TelegramObject, Update
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Starts a trace per update, register it as an outer middleware of `update`."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if TYPE_CHECKING:
+            assert isinstance(event, Update)
+
+        with TRACER.trace(event.event_type, event.update_id):
+            return await handler(event, data)
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """
+    Bot API calls as trace spans, with the time spent waiting in the outbound queue.
+
+    Requests are counted too, retries after a `retry_after` only once.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        BOT_API_REQUESTS.inc(method.__api_method__)
+        with span(f"bot.{method.__api_method__}"):
+            return await make_request(bot, method)
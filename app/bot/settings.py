@@ -24,6 +24,9 @@ class RedisSettings(BaseSettings):
     user: str
     password: SecretStr
     db: int
+    compact_keys: bool = True
+    # Fall back to full-name keys, keep on for a cache TTL after switching
+    legacy_key_reads: bool = True
 
 
 class Settings(BaseSettings):
@@ -31,11 +34,15 @@ class Settings(BaseSettings):
 
     dev: bool = False
     test_server: bool = False
+    bot_api_url: str | None = None  # Local Bot API server or `benchmarks.mock_bot_api`
     developer_id: int
     webhooks: bool = False
     bot_token: SecretStr
     webhook_url: SecretStr
     webhook_secret_token: SecretStr
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9090  # `/metrics` is served on its own port, 0 disables it
+    trace_threshold: float = 0.5  # Seconds, traces of slower updates are kept
 
     psql: PostgresSettings = PostgresSettings()
     redis: RedisSettings = RedisSettings()
@@ -50,8 +57,8 @@ def psql_dsn(self, is_migration: bool = False) -> URL:
             database=self.psql.db,
         )
 
-    async def redis_dsn(self) -> Redis:
-        return Redis.from_url(
+    async def redis_dsn(self, redis_class: type[Redis] = Redis) -> Redis:
+        return redis_class.from_url(
             "redis://{username}:{password}@{host}:{port}/{db}".format(
                 username=self.redis.user,
                 password=urllib.parse.quote(self.redis.password.get_secret_value()),
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -10,7 +11,12 @@
 )
 from sqlalchemy.orm import DeclarativeBase
 
+from utils.metrics import SQL_STATEMENTS
+from utils.tracing import end_span, start_span
+
 if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, ExceptionContext
+
     from settings import Settings
 
 
@@ -34,9 +40,29 @@ async def create_db_pool(
         max_overflow=10,
         pool_size=100,
     )
+    trace_engine(engine)
 
     return engine, async_sessionmaker(engine, expire_on_commit=False)
 
 
+def trace_engine(engine: AsyncEngine) -> None:
+    """Count executed statements and add a trace span per statement, see `utils.tracing`."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn: Connection, _cursor: Any, statement: str, *_: Any) -> None:
+        SQL_STATEMENTS.inc()
+        name = f"sql {' '.join(statement.split())[:80]}"
+        conn.info.setdefault("trace_spans", []).append(start_span(name))
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn: Connection, *_: Any) -> None:
+        end_span(conn.info["trace_spans"].pop())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context: ExceptionContext) -> None:
+        if context.connection is not None and context.connection.info.get("trace_spans"):
+            end_span(context.connection.info["trace_spans"].pop())
+
+
 async def close_db_pool(engine: AsyncEngine) -> None:
     await engine.dispose()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import UTC, datetime
+from itertools import batched
+from typing import TYPE_CHECKING, Final
+
+from sqlalchemy import BigInteger, String, cast, column, update, values
+from sqlalchemy.dialects.postgresql import CITEXT, TIMESTAMP
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.operators import eq, ne
+
+from storages.psql.user.user_model import UserModel
+
+if TYPE_CHECKING:
+    from aiogram.types import User
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL: Final[float] = 30.0  # seconds
+DEFAULT_CHUNK_SIZE: Final[int] = 1000  # rows per `UPDATE ... FROM (VALUES ...)`
+
+# id, username, first_name, last_name, last_active
+type ActivityRow = tuple[int, str | None, str, str | None, datetime]
+
+
+class UserActivityBuffer:
+    """
+    Write-behind buffer for `UserModel.last_active` and profile (username/first/last name).
+
+    `touch` only records the latest state of a user in memory, so no matter how many updates a
+    user sends, each flush writes at most one row per active user. Flushing runs every
+    `flush_interval` seconds in one transaction: usernames held by other users are freed
+    first, then all rows are updated by bulk `UPDATE ... FROM (VALUES ...)` statements.
+    """
+
+    def __init__(
+        self,
+        db_pool: async_sessionmaker[AsyncSession],
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        self.db_pool = db_pool
+        self.flush_interval = flush_interval
+        self.chunk_size = chunk_size
+        self._pending: dict[int, ActivityRow] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, user: User) -> None:
+        self._pending[user.id] = (
+            user.id,
+            user.username,
+            user.first_name,
+            user.last_name,
+            datetime.now(tz=UTC).replace(tzinfo=None),
+        )
+
+    @staticmethod
+    def _dedupe_usernames(rows: dict[int, ActivityRow]) -> list[ActivityRow]:
+        """Only the most recently active claimant of a username keeps it (`CITEXT` is unique)."""
+        owners: dict[str, ActivityRow] = {}
+        for row in rows.values():
+            if not row[1]:
+                continue
+
+            username = row[1].casefold()
+            if username not in owners or owners[username][4] < row[4]:
+                owners[username] = row
+
+        return [
+            row if not row[1] or owners[row[1].casefold()] is row else (row[0], None, *row[2:])
+            for row in rows.values()
+        ]
+
+    async def _write(self, session: AsyncSession, rows: tuple[ActivityRow, ...]) -> None:
+        activity = values(
+            column("id", BigInteger),
+            column("username", CITEXT),
+            column("first_name", String),
+            column("last_name", String),
+            column("last_active", TIMESTAMP),
+            name="activity",
+        ).data(list(rows))
+
+        await session.execute(
+            update(UserModel)
+            .where(
+                eq(UserModel.username, cast(activity.c.username, CITEXT)),
+                ne(UserModel.id, activity.c.id),
+            )
+            .values(username=None)
+            .execution_options(synchronize_session=False),
+        )
+        await session.execute(
+            update(UserModel)
+            .where(eq(UserModel.id, activity.c.id))
+            .values(
+                username=activity.c.username,
+                first_name=activity.c.first_name,
+                last_name=activity.c.last_name,
+                last_active=activity.c.last_active,
+            )
+            .execution_options(synchronize_session=False),
+        )
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+
+        try:
+            async with self.db_pool() as session, session.begin():
+                for chunk in batched(
+                    self._dedupe_usernames(pending), self.chunk_size, strict=False
+                ):
+                    await self._write(session, chunk)
+
+        except SQLAlchemyError:
+            logger.exception("Failed to flush activity of %d users", len(pending))
+
+            # Keep rows for the next attempt, unless a newer state was recorded meanwhile
+            self._pending = pending | self._pending
+            return 0
+
+        return len(pending)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="user-activity-flush")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        await self.flush()
@@ -0,0 +1,497 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import cache
+from secrets import randbelow
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, ClassVar, Final, Self
+
+import msgspec
+
+from storages.redis.key_schema import KEY_SCHEMA
+from storages.redis.l1_cache import L1_CACHE
+from storages.redis.scan import delete_by_pattern
+from utils.metrics import REDIS_MODEL_READS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from redis.asyncio import Redis
+    from redis.commands.core import AsyncScript
+    from redis.typing import ExpiryT
+
+logger = logging.getLogger(__name__)
+
+ENCODER: Final[msgspec.msgpack.Encoder] = msgspec.msgpack.Encoder()
+
+# 0xC1 is never used by msgpack, so a payload starting with it is `marker, version, body`.
+# Payloads without the marker were written before versioning and are version 0.
+VERSION_MARKER: Final[int] = 0xC1
+
+# Replace an outdated payload with the upgraded one, unless the key was written meanwhile
+REWRITE_SCRIPT: Final[str] = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+end
+return 0
+"""
+
+# The same for a field of a hash, `ARGV[1]` is the field
+REWRITE_FIELD_SCRIPT: Final[str] = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HSETEX', KEYS[1], 'KEEPTTL', 'FIELDS', 1, ARGV[1], ARGV[3])
+end
+return 0
+"""
+
+
+@cache
+def get_decoder[T](model: type[T]) -> msgspec.msgpack.Decoder[T]:
+    """One decoder per type, `msgspec.msgpack.decode(type=...)` would rebuild it on every call."""
+    return msgspec.msgpack.Decoder(model)
+
+
+def split_version(data: bytes) -> tuple[int, memoryview]:
+    """Return the schema version and the msgpack body of a stored payload."""
+    if data[0] == VERSION_MARKER:
+        return data[1], memoryview(data)[2:]
+    return 0, memoryview(data)
+
+
+def encode_versioned(obj: Any, version: int) -> bytes:
+    return bytes((VERSION_MARKER, version)) + ENCODER.encode(obj)
+
+
+@dataclass(frozen=True, slots=True)
+class TTLPolicy:
+    ttl: timedelta
+    # Random extra time, so keys written together don't expire together
+    jitter: timedelta = timedelta()
+
+    def __call__(self) -> timedelta:
+        if jitter := int(self.jitter.total_seconds()):
+            return self.ttl + timedelta(seconds=randbelow(jitter + 1))
+        return self.ttl
+
+
+@cache
+def get_script(redis: Redis, script: str) -> AsyncScript:
+    """One registered script per client, `register_script` would hash it on every call."""
+    return redis.register_script(script)
+
+
+async def rewrite_outdated(redis: Redis, rewrites: Mapping[str, tuple[bytes, bytes]]) -> None:
+    """Store upgraded payloads (key -> old data, new data), keeping TTLs."""
+    script = get_script(redis, REWRITE_SCRIPT)
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for key, (old, new) in rewrites.items():
+            await script(keys=(key,), args=(old, new), client=pipe)
+        await pipe.execute()
+
+
+async def rewrite_outdated_fields(
+    redis: Redis, rewrites: Mapping[tuple[str, bytes | str], tuple[bytes, bytes]]
+) -> None:
+    """Store upgraded payloads of hash fields ((key, field) -> old data, new data), keeping TTLs."""
+    script = get_script(redis, REWRITE_FIELD_SCRIPT)
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for (key, field), (old, new) in rewrites.items():
+            await script(keys=(key,), args=(field, old, new), client=pipe)
+        await pipe.execute()
+
+
+async def read_legacy(
+    redis: Redis,
+    wanted: Mapping[str, tuple[type[RedisModel], tuple[Any, ...]]],
+) -> dict[str, Any]:
+    """
+    Look up models missing under their keys (key -> model, key args) under the legacy keys.
+
+    Found values are moved to the new keys with the remaining TTL. `SET NX` doesn't overwrite a
+    value written meanwhile, and writes during the migration window delete the legacy key too.
+    """
+    legacy = {key: model.legacy_key(*key_args) for key, (model, key_args) in wanted.items()}
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for legacy_key in legacy.values():
+            pipe.get(legacy_key)
+            pipe.pttl(legacy_key)
+        results = await pipe.execute()
+
+    found = {
+        key: (data, ttl)
+        for key, data, ttl in zip(legacy, results[::2], results[1::2], strict=True)
+        if data
+    }
+    if not found:
+        return {}
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for key, (data, ttl) in found.items():
+            if ttl > 0:
+                pipe.set(key, data, px=ttl, nx=True)
+            else:
+                pipe.set(key, data, ex=wanted[key][0].ttl_policy(), nx=True)
+            pipe.unlink(legacy[key])
+        await pipe.execute()
+
+    # Outdated payloads moved here are upgraded on the next read of the new key
+    return {key: wanted[key][0].load(data)[0] for key, (data, _) in found.items()}
+
+
+async def fetch(
+    redis: Redis,
+    wanted: Mapping[str, tuple[type[RedisModel], tuple[Any, ...]]],
+) -> dict[str, Any]:
+    """
+    Read models of any types (key -> model, key args) in one MGET.
+
+    Payloads of older schema versions are upgraded and rewritten in place, missing keys are
+    looked up under legacy keys while `KEY_SCHEMA.legacy_reads` is on.
+    """
+    models: dict[str, Any] = {}
+    rewrites: dict[str, tuple[bytes, bytes]] = {}
+
+    for key, data in zip(wanted, await redis.mget(wanted), strict=True):
+        if not data:
+            models[key] = None
+            continue
+
+        models[key], outdated = wanted[key][0].load(data)
+        if outdated and models[key] is not None:
+            rewrites[key] = (data, models[key].encode())
+
+    if rewrites:
+        await rewrite_outdated(redis, rewrites)
+
+    if KEY_SCHEMA.legacy_reads and (
+        misses := {key: wanted[key] for key, model in models.items() if model is None}
+    ):
+        models.update(await read_legacy(redis, misses))
+
+    for key, model in models.items():
+        REDIS_MODEL_READS.inc(wanted[key][0].__name__, "miss" if model is None else "redis")
+
+    return models
+
+
+class RedisModel(msgspec.Struct):
+    """
+    Base for models stored as one msgpack value per Redis key.
+
+    The key is built by `KEY_SCHEMA` from `key_prefix` and key args, instances are identified by
+    `key_fields` in `save`. With `l1_cached` models are also kept in `L1_CACHE`, invalidated on
+    every worker on write.
+
+    Payloads carry `schema_version`. To change fields of a model, bump the version and keep the
+    previous definition in `schema_history` under the old version (as a plain `msgspec.Struct`).
+    Stored payloads of that version are then decoded with it, converted by `upgrade` and lazily
+    rewritten, so a deploy doesn't need a cache flush.
+    """
+
+    key_prefix: ClassVar[str]  # One of `RedisKeyPrefix`
+    key_fields: ClassVar[tuple[str, ...]] = ("id",)
+    ttl_policy: ClassVar[TTLPolicy] = TTLPolicy(timedelta(days=1))
+    l1_cached: ClassVar[bool] = False
+    schema_version: ClassVar[int] = 0
+    # msgspec resolves class annotations, so `Mapping` is imported at runtime
+    schema_history: ClassVar[Mapping[int, type[msgspec.Struct]]] = MappingProxyType({})
+
+    @classmethod
+    def key(cls, *key_args: Any) -> str:
+        return KEY_SCHEMA.key(cls.__name__, cls.key_prefix, *key_args)
+
+    @classmethod
+    def legacy_key(cls, *key_args: Any) -> str:
+        return KEY_SCHEMA.legacy_key(cls.__name__, *key_args)
+
+    def key_args(self) -> tuple[Any, ...]:
+        return tuple(getattr(self, field) for field in self.key_fields)
+
+    @classmethod
+    def upgrade(cls, old: msgspec.Struct) -> Self:
+        """Convert a model of an older schema version, by default fields are matched by name."""
+        return msgspec.convert(old, cls, from_attributes=True)
+
+    @classmethod
+    def load(cls, data: bytes) -> tuple[Self | None, bool]:
+        """
+        Decode a stored payload of any known schema version, return it and if it's outdated.
+
+        Payloads that can't be decoded are logged and treated as missing.
+        """
+        version, body = split_version(data)
+
+        try:
+            if version == cls.schema_version:
+                return get_decoder(cls).decode(body), False
+            return cls.upgrade(get_decoder(cls.schema_history[version]).decode(body)), True
+
+        except KeyError, msgspec.DecodeError, msgspec.ValidationError:
+            logger.warning("Can't decode %s payload of version %d", cls.__name__, version)
+            return None, False
+
+    def encode(self) -> bytes:
+        return encode_versioned(self, self.schema_version)
+
+    @classmethod
+    async def get(cls, redis: Redis, *key_args: Any) -> Self | None:
+        (model,) = await cls.get_many(redis, (key_args,))
+        return model
+
+    @classmethod
+    async def get_many(
+        cls, redis: Redis, keys_args: Iterable[tuple[Any, ...]]
+    ) -> list[Self | None]:
+        keys = {cls.key(*key_args): (cls, key_args) for key_args in keys_args}
+        models: dict[str, Self | None] = {}
+
+        if cls.l1_cached:
+            for key in keys:
+                if cached := L1_CACHE.get(key):
+                    models[key] = cached
+                    REDIS_MODEL_READS.inc(cls.__name__, "l1")
+
+        if missing := {key: wanted for key, wanted in keys.items() if key not in models}:
+            epoch = L1_CACHE.epoch
+            models.update(await fetch(redis, missing))
+
+            if cls.l1_cached:
+                for key in missing:
+                    if models[key] is not None:
+                        L1_CACHE.set(key, models[key], epoch)
+
+        return [models[key] for key in keys]
+
+    @classmethod
+    async def put_many(
+        cls,
+        redis: Redis,
+        models: Mapping[tuple[Any, ...], Self],
+        ttl: ExpiryT | None = None,
+    ) -> list[bool]:
+        """Write `models` (key args -> model), TTL defaults to `ttl_policy`, drawn per key."""
+        keys = [cls.key(*key_args) for key_args in models]
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, model in zip(keys, models.values(), strict=True):
+                pipe.setex(key, cls.ttl_policy() if ttl is None else ttl, model.encode())
+            if KEY_SCHEMA.legacy_reads:
+                pipe.unlink(*(cls.legacy_key(*key_args) for key_args in models))
+            if cls.l1_cached:
+                L1_CACHE.publish(pipe, keys)
+            results = await pipe.execute()
+
+        if cls.l1_cached:
+            for key, model in zip(keys, models.values(), strict=True):
+                L1_CACHE.set(key, model)
+
+        return results[: len(keys)]
+
+    @classmethod
+    async def put(
+        cls,
+        redis: Redis,
+        key_args: tuple[Any, ...],
+        model: Self,
+        ttl: ExpiryT | None = None,
+    ) -> bool:
+        (result,) = await cls.put_many(redis, {key_args: model}, ttl)
+        return result
+
+    async def save(self, redis: Redis, ttl: ExpiryT | None = None) -> bool:
+        return await self.put(redis, self.key_args(), self, ttl)
+
+    @classmethod
+    async def delete_many(cls, redis: Redis, keys_args: Iterable[tuple[Any, ...]]) -> int:
+        keys_args = list(keys_args)
+        if not (keys := [cls.key(*key_args) for key_args in keys_args]):
+            return 0
+
+        if cls.l1_cached:
+            L1_CACHE.pop(*keys)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            if KEY_SCHEMA.legacy_reads:
+                pipe.unlink(*(cls.legacy_key(*key_args) for key_args in keys_args))
+            if cls.l1_cached:
+                L1_CACHE.publish(pipe, keys)
+            result, *_ = await pipe.execute()
+        return result
+
+    @classmethod
+    async def delete(cls, redis: Redis, *key_args: Any) -> int:
+        return await cls.delete_many(redis, (key_args,))
+
+    @classmethod
+    async def delete_all(cls, redis: Redis) -> int:
+        deleted = await delete_by_pattern(redis, cls.key("*"))
+        if KEY_SCHEMA.legacy_reads:
+            deleted += await delete_by_pattern(redis, cls.legacy_key("*"))
+        if cls.l1_cached:
+            await L1_CACHE.invalidate(redis, ())
+        return deleted
+
+
+class ChatHashModel(RedisModel):
+    """
+    Base for small per-chat records, stored as fields of one hash per chat.
+
+    Key args are `(chat_id, field_id)`. The field is written with `HSETEX`, so every record has
+    its own TTL, and the hash disappears with its last field. Records of a chat can be read or
+    dropped at once with `get_all` and `delete_for_chat`. Outdated payloads are upgraded on read
+    and rewritten in place, keeping the field TTL.
+
+    Models that keep key args out of the payload override `load_field`. With `legacy_hash`,
+    records missing in the hash are looked up in the one under `legacy_key(chat_id)` while
+    `KEY_SCHEMA.legacy_reads` is on, and writes drop them there.
+    """
+
+    key_fields: ClassVar[tuple[str, ...]] = ()  # Key args are passed explicitly, see `put`
+    legacy_hash: ClassVar[bool] = False
+
+    @classmethod
+    def key(cls, *key_args: Any) -> str:
+        """Key of the chat hash, only the chat id of `key_args` is used."""
+        return super().key(*key_args[:1])
+
+    @classmethod
+    def legacy_key(cls, *key_args: Any) -> str:
+        return super().legacy_key(*key_args[:1])
+
+    @classmethod
+    def legacy_reads(cls) -> bool:
+        return cls.legacy_hash and KEY_SCHEMA.legacy_reads
+
+    @classmethod
+    def load_field(
+        cls,
+        chat_id: int,  # noqa: ARG003
+        field_id: int,  # noqa: ARG003
+        data: bytes,
+    ) -> tuple[Self | None, bool]:
+        """Decode the payload of a field, return it and if it's outdated."""
+        return cls.load(data)
+
+    @classmethod
+    async def get_many(
+        cls, redis: Redis, keys_args: Iterable[tuple[Any, ...]]
+    ) -> list[Self | None]:
+        keys_args = list(keys_args)
+        legacy_reads = cls.legacy_reads()
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for chat_id, field_id in keys_args:
+                pipe.hget(cls.key(chat_id), KEY_SCHEMA.part(field_id))
+                if legacy_reads:
+                    pipe.hget(cls.legacy_key(chat_id), str(field_id))
+            results = await pipe.execute()
+
+        if not legacy_reads:
+            results = [item for data in results for item in (data, None)]
+
+        models: list[Self | None] = []
+        rewrites: dict[tuple[str, bytes | str], tuple[bytes, bytes]] = {}
+
+        for (chat_id, field_id), data, legacy in zip(
+            keys_args, results[::2], results[1::2], strict=True
+        ):
+            model: Self | None = None
+            if data:
+                model, outdated = cls.load_field(chat_id, field_id, data)
+                if outdated and model is not None:
+                    rewrites[cls.key(chat_id), KEY_SCHEMA.part(field_id)] = (data, model.encode())
+            elif legacy:
+                model, _ = cls.load_field(chat_id, field_id, legacy)
+
+            models.append(model)
+            REDIS_MODEL_READS.inc(cls.__name__, "miss" if model is None else "redis")
+
+        if rewrites:
+            await rewrite_outdated_fields(redis, rewrites)
+        return models
+
+    @classmethod
+    async def get_all(cls, redis: Redis, chat_id: int) -> dict[int, Self]:
+        """Read all records of a chat, field id -> model."""
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(cls.key(chat_id))
+            if cls.legacy_reads():
+                pipe.hgetall(cls.legacy_key(chat_id))
+            fields, *legacy = await pipe.execute()
+
+        # Records still in the legacy hash, unless they were written under the new key already
+        models = {
+            int(field_id): model
+            for legacy_fields in legacy
+            for field_id, data in legacy_fields.items()
+            if (model := cls.load_field(chat_id, int(field_id), data)[0]) is not None
+        }
+        rewrites: dict[tuple[str, bytes | str], tuple[bytes, bytes]] = {}
+
+        for field, data in fields.items():
+            field_id = KEY_SCHEMA.parse_id(field)
+            model, outdated = cls.load_field(chat_id, field_id, data)
+            if model is None:
+                continue
+
+            models[field_id] = model
+            if outdated:
+                rewrites[cls.key(chat_id), field] = (data, model.encode())
+
+        if rewrites:
+            await rewrite_outdated_fields(redis, rewrites)
+        return models
+
+    @classmethod
+    async def put_many(
+        cls,
+        redis: Redis,
+        models: Mapping[tuple[Any, ...], Self],
+        ttl: ExpiryT | None = None,
+    ) -> list[bool]:
+        """Write `models` ((chat id, field id) -> model), TTL defaults to `ttl_policy`."""
+        async with redis.pipeline(transaction=False) as pipe:
+            for (chat_id, field_id), model in models.items():
+                # `mapping`, as redis-py types `value` as `str` while payloads are bytes
+                pipe.hsetex(
+                    cls.key(chat_id),
+                    mapping={KEY_SCHEMA.part(field_id): model.encode()},
+                    ex=cls.ttl_policy() if ttl is None else ttl,
+                )
+            if cls.legacy_reads():
+                for chat_id, field_id in models:
+                    pipe.hdel(cls.legacy_key(chat_id), str(field_id))
+            results = await pipe.execute()
+
+        return [bool(result) for result in results[: len(models)]]
+
+    @classmethod
+    async def delete_many(cls, redis: Redis, keys_args: Iterable[tuple[Any, ...]]) -> int:
+        legacy_reads = cls.legacy_reads()
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for chat_id, field_id in keys_args:
+                pipe.hdel(cls.key(chat_id), KEY_SCHEMA.part(field_id))
+                if legacy_reads:
+                    pipe.hdel(cls.legacy_key(chat_id), str(field_id))
+            return sum(await pipe.execute())
+
+    @classmethod
+    async def delete_for_chat(cls, redis: Redis, chat_id: int) -> int:
+        keys = [cls.key(chat_id)]
+        if cls.legacy_reads():
+            keys.append(cls.legacy_key(chat_id))
+
+        async with redis.pipeline(transaction=True) as pipe:
+            for key in keys:
+                pipe.hlen(key)
+            pipe.unlink(*keys)
+            *deleted, _ = await pipe.execute()
+        return sum(deleted)
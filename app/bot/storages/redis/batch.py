@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Self
+
+from storages.redis.base import fetch
+from storages.redis.l1_cache import L1_CACHE
+from utils.metrics import REDIS_MODEL_READS
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+    from storages.redis.base import RedisModel
+
+
+class RedisBatch:
+    """
+    Collects keys of different Redis models and fetches all of them in one MGET.
+
+    `RedisModel.get_many` does the same for keys of one model. Keys served by the L1 cache are
+    not sent to Redis, and `load` only fetches keys that were added since the previous call, so
+    it's cheap to call it again after adding more keys.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[str, tuple[type[RedisModel], tuple[Any, ...]]] = {}
+        self._results: dict[str, Any] = {}
+
+    def add(self, model: type[RedisModel], *key_args: Any) -> Self:
+        key = model.key(*key_args)
+        if key not in self._results:
+            self._pending[key] = (model, key_args)
+        return self
+
+    async def load(self, redis: Redis) -> Self:
+        if not self._pending:
+            return self
+
+        pending, self._pending = self._pending, {}
+        missing: dict[str, tuple[type[RedisModel], tuple[Any, ...]]] = {}
+
+        for key, (model, key_args) in pending.items():
+            if model.l1_cached and (cached := L1_CACHE.get(key)):
+                self._results[key] = cached
+                REDIS_MODEL_READS.inc(model.__name__, "l1")
+            else:
+                missing[key] = (model, key_args)
+
+        if not missing:
+            return self
+
+        epoch = L1_CACHE.epoch
+        self._results.update(await fetch(redis, missing))
+
+        for key, (model, _) in missing.items():
+            if model.l1_cached and self._results[key] is not None:
+                L1_CACHE.set(key, self._results[key], epoch)
+
+        return self
+
+    def get[T: RedisModel](self, model: type[T], *key_args: Any) -> T | None:
+        return self._results.get(model.key(*key_args))
@@ -1,6 +1,6 @@
+import logging
 from datetime import UTC, datetime, timedelta
-from secrets import randbelow
-from typing import Final, Literal, Self, cast
+from typing import ClassVar, Final, Self
 
 import msgspec
 from aiogram import Bot
@@ -17,11 +17,84 @@
 from redis.asyncio.client import Redis
 from redis.typing import ExpiryT
 
+from storages.redis.base import (
+    ChatHashModel,
+    TTLPolicy,
+    encode_versioned,
+    get_decoder,
+    split_version,
+)
+from storages.redis.key_schema import RedisKeyPrefix
+
+logger = logging.getLogger(__name__)
+
 TG_MIN_DATETIME: Final[datetime] = datetime(1970, 1, 1, tzinfo=UTC)
-ENCODER: Final[msgspec.msgpack.Encoder] = msgspec.msgpack.Encoder()
 
+# Status byte values and permission bit positions of the packed format, append only
+STATUSES: Final[tuple[ChatMemberStatus, ...]] = (
+    ChatMemberStatus.CREATOR,
+    ChatMemberStatus.ADMINISTRATOR,
+    ChatMemberStatus.MEMBER,
+    ChatMemberStatus.RESTRICTED,
+    ChatMemberStatus.LEFT,
+    ChatMemberStatus.KICKED,
+)
+PERMISSIONS: Final[tuple[str, ...]] = (
+    "can_be_edited",
+    "is_anonymous",
+    "can_manage_chat",
+    "can_delete_messages",
+    "can_manage_video_chats",
+    "can_restrict_members",
+    "can_promote_members",
+    "can_change_info",
+    "can_invite_users",
+    "can_post_messages",
+    "can_edit_messages",
+    "can_pin_messages",
+    "can_manage_topics",
+    "can_send_messages",
+    "can_send_audios",
+    "can_send_documents",
+    "can_send_photos",
+    "can_send_videos",
+    "can_send_video_notes",
+    "can_send_voice_notes",
+    "can_send_polls",
+    "can_send_other_messages",
+    "can_add_web_page_previews",
+)
+
+# The unpacked payload is the whole struct as a msgpack array of 29 items, that is an `array 16`
+UNPACKED_HEADER: Final[int] = 0xDC
+
+
+class _PackedMember(msgspec.Struct, array_like=True, omit_defaults=True):
+    status: int  # Index in `STATUSES`
+    present: int = 0  # Bit set if the permission is not `None`
+    values: int = 0  # Bit set if the permission is `True`
+    custom_title: str | None = None
+    until_date: int | None = None  # Unix time
+
+    @property
+    def permissions(self) -> dict[str, bool]:
+        return {
+            name: bool(self.values >> bit & 1)
+            for bit, name in enumerate(PERMISSIONS)
+            if self.present >> bit & 1
+        }
+
+
+class RDChatMemberModel(ChatHashModel, kw_only=True, array_like=True):
+    """Members of a chat live in one hash, `user_id` -> payload, each field with own TTL."""
+
+    key_prefix: ClassVar[str] = RedisKeyPrefix.chat_member
+    key_fields: ClassVar[tuple[str, ...]] = ("chat_id", "user_id")
+    ttl_policy: ClassVar[TTLPolicy] = TTLPolicy(timedelta(minutes=45), jitter=timedelta(minutes=30))
+    # 0: untagged, either unpacked or packed. 1: packed `_PackedMember`. See `RedisModel`
+    schema_version: ClassVar[int] = 1
+    legacy_hash: ClassVar[bool] = True
 
-class RDChatMemberModel(msgspec.Struct, kw_only=True, array_like=True):
     chat_id: int
     user_id: int
     status: ChatMemberStatus
@@ -53,48 +126,78 @@ class RDChatMemberModel(msgspec.Struct, kw_only=True, array_like=True):
     can_add_web_page_previews: bool | None = None
     until_date: datetime | None = None
 
-    @classmethod
-    def key(cls, chat_id: int, user_id: int | Literal["*"]) -> str:
-        return f"{cls.__name__}:{chat_id}:{user_id}"
+    def pack(self) -> bytes:
+        """
+        Encode the member into the compact payload stored in Redis.
+
+        `chat_id` and `user_id` are not stored, they are part of the hash key and field.
+        """
+        present = values = 0
+        for bit, name in enumerate(PERMISSIONS):
+            if (value := getattr(self, name)) is not None:
+                present |= 1 << bit
+                values |= value << bit
+
+        return encode_versioned(
+            _PackedMember(
+                status=STATUSES.index(self.status),
+                present=present,
+                values=values,
+                custom_title=self.custom_title,
+                until_date=int(self.until_date.timestamp()) if self.until_date else None,
+            ),
+            self.schema_version,
+        )
 
     @classmethod
-    async def get(cls, redis: Redis, chat_id: int, user_id: int) -> Self | None:
-        data = await redis.get(cls.key(chat_id, user_id))
-        if data:
-            return msgspec.msgpack.decode(data, type=cls)
-        return None
+    def unpack(cls, chat_id: int, user_id: int, data: bytes) -> Self:
+        version, body = split_version(data)
+        if version == 0 and data[0] == UNPACKED_HEADER:
+            return get_decoder(cls).decode(body)
+
+        # Untagged packed payloads have the same layout as version 1
+        packed = get_decoder(_PackedMember).decode(body)
+        return cls(
+            chat_id=chat_id,
+            user_id=user_id,
+            status=STATUSES[packed.status],
+            custom_title=packed.custom_title,
+            until_date=(
+                None
+                if packed.until_date is None
+                else datetime.fromtimestamp(packed.until_date, UTC)
+            ),
+            **packed.permissions,
+        )
 
     @classmethod
-    async def get_all(cls, redis: Redis, chat_id: int) -> list[Self]:
-        keys = await redis.keys(cls.key(chat_id, "*"))
-        if keys:
-            return [msgspec.msgpack.decode(await redis.get(key), type=cls) for key in keys]
-        return []
+    def is_outdated(cls, data: bytes) -> bool:
+        return split_version(data)[0] != cls.schema_version
 
-    async def save(self, redis: Redis, ttl: ExpiryT | None = None) -> Self:
-        if self.until_date and ttl is None:
-            if self.until_date == TG_MIN_DATETIME:
-                ttl = timedelta(minutes=45 + randbelow(75 - 45 + 1))
+    def encode(self) -> bytes:
+        return self.pack()
 
-            else:
-                ttl = self.until_date - datetime.now(tz=self.until_date.tzinfo)
+    @classmethod
+    def load_field(cls, chat_id: int, field_id: int, data: bytes) -> tuple[Self | None, bool]:
+        """Unpack `data`, log payloads that can't be decoded and treat them as missing."""
+        try:
+            return cls.unpack(chat_id, field_id, data), cls.is_outdated(data)
 
-        elif ttl is None:
-            ttl = timedelta(minutes=45 + randbelow(75 - 45 + 1))
+        except IndexError, msgspec.DecodeError, msgspec.ValidationError:
+            logger.warning("Can't decode %s payload of user %d", cls.__name__, field_id)
+            return None, False
 
-        await redis.setex(self.key(self.chat_id, self.user_id), ttl, ENCODER.encode(self))
-        return self
+    async def save(self, redis: Redis, ttl: ExpiryT | None = None) -> bool:
+        """Restrictions and bans are cached until they end, TTL defaults to `ttl_policy`."""
+        if ttl is None and self.until_date and self.until_date != TG_MIN_DATETIME:
+            ttl = self.until_date - datetime.now(tz=self.until_date.tzinfo)
 
-    @classmethod
-    async def delete(cls, redis: Redis, chat_id: int, user_id: int) -> int:
-        return await redis.delete(cls.key(chat_id, user_id))
+            # `HSETEX EX` takes whole seconds, a member whose restriction is over is stale anyway
+            if ttl < timedelta(seconds=1):
+                await self.delete(redis, *self.key_args())
+                return False
 
-    @classmethod
-    async def delete_for_chat(cls, redis: Redis, chat_id: int) -> int:
-        keys = await redis.keys(cls.key(chat_id, "*"))
-        if keys:
-            return await redis.delete(*keys)
-        return 0
+        return await super().save(redis, ttl)
 
     @classmethod
     def resolve(
@@ -206,16 +309,16 @@ def kicked(cls, chat_id: int, chat_member: ChatMemberBanned) -> Self:
 
 
 class RDChatBotModel(RDChatMemberModel):
+    key_prefix: ClassVar[str] = RedisKeyPrefix.chat_bot
+
     @classmethod
     async def get_or_create(cls, redis: Redis, chat_id: int, bot: Bot) -> Self:
         bot_chat_member: Self | None = await cls.get(redis, chat_id, bot.id)
 
         if not bot_chat_member:
-            bot_chat_member: ResultChatMemberUnion = await bot.get_chat_member(chat_id, bot.id)
+            chat_member: ResultChatMemberUnion = await bot.get_chat_member(chat_id, bot.id)
 
-            bot_chat_member = await cls.resolve(
-                chat_id=chat_id,
-                chat_member=cast(ResultChatMemberUnion, bot_chat_member),
-            ).save(redis)
+            bot_chat_member = cls.resolve(chat_id=chat_id, chat_member=chat_member)
+            await bot_chat_member.save(redis)
 
         return bot_chat_member
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from string import ascii_letters, digits
+from typing import Any, Final
+
+ALPHABET: Final[str] = digits + ascii_letters
+
+
+def pack_id(value: int) -> str:
+    """Base62 form of an id, `-1001234567890` takes 8 characters instead of 14."""
+    if value < 0:
+        return "-" + pack_id(-value)
+
+    packed = ""
+    while True:
+        value, rest = divmod(value, len(ALPHABET))
+        packed = ALPHABET[rest] + packed
+        if not value:
+            return packed
+
+
+def unpack_id(packed: str) -> int:
+    if packed.startswith("-"):
+        return -unpack_id(packed[1:])
+
+    value = 0
+    for char in packed:
+        value = value * len(ALPHABET) + ALPHABET.index(char)
+    return value
+
+
+@dataclass(frozen=True)
+class __RedisKeyPrefix:
+    user: str = "u"
+    user_settings: str = "us"
+    chat: str = "c"
+    chat_settings: str = "cs"
+    chat_member: str = "m"
+    chat_bot: str = "mb"
+    msg_owner: str = "o"
+    msg_multiple_owners: str = "oo"
+    throttler: str = "t"
+    single_flight: str = "sf"
+
+    def __post_init__(self) -> None:
+        seen = set()
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if not value or ":" in value or "*" in value:
+                msg = f"Invalid Redis key prefix: {field.name} - {value!r}"
+                raise ValueError(msg)
+            if value in seen:
+                msg = f"Collision detected for Redis key prefix: {field.name} - {value}"
+                raise ValueError(msg)
+            seen.add(value)
+
+
+RedisKeyPrefix = __RedisKeyPrefix()
+
+
+def _is_canonical_int(part: str) -> bool:
+    """Only strings that `str(int)` gives back, "007" or "-0" would collide after packing."""
+    return part.isascii() and part.removeprefix("-").isdecimal() and str(int(part)) == part
+
+
+class KeySchema:
+    """
+    Builds Redis keys from a short registered prefix and parts, ids packed with `pack_id`.
+
+    With `compact` disabled keys are built the old way, `{name}:{parts...}` with the full
+    class name. `legacy_reads` is the migration window after switching to compact keys: the
+    models fall back to the old keys on a miss, so a deploy doesn't start with a cold cache.
+    """
+
+    def __init__(self, compact: bool = True, legacy_reads: bool = True) -> None:
+        self.compact = compact
+        self.legacy_reads = legacy_reads
+
+    def configure(self, compact: bool, legacy_reads: bool) -> None:
+        self.compact = compact
+        self.legacy_reads = legacy_reads and compact
+
+    def part(self, part: Any) -> str:
+        """Key part (or hash field) for `part`, ids are packed with compact keys."""
+        if not self.compact:
+            return str(part)
+        if isinstance(part, int) and not isinstance(part, bool):
+            return pack_id(part)
+        if isinstance(part, str) and _is_canonical_int(part):
+            return pack_id(int(part))
+        return str(part)
+
+    def parse_id(self, part: str | bytes) -> int:
+        part = part.decode() if isinstance(part, bytes) else part
+        return unpack_id(part) if self.compact else int(part)
+
+    @staticmethod
+    def legacy_key(name: str, *parts: Any) -> str:
+        return ":".join((name, *map(str, parts)))
+
+    def key(self, name: str, prefix: str, *parts: Any) -> str:
+        if not self.compact:
+            return self.legacy_key(name, *parts)
+        return ":".join((prefix, *map(self.part, parts)))
+
+
+KEY_SCHEMA: Final[KeySchema] = KeySchema()
+
+__all__ = ("KEY_SCHEMA", "KeySchema", "RedisKeyPrefix", "pack_id", "unpack_id")
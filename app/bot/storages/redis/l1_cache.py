@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import suppress
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Final
+from uuid import uuid4
+
+import msgspec
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from redis.asyncio import Redis
+    from redis.asyncio.client import Pipeline
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL: Final[str] = "L1Cache:invalidate"
+DEFAULT_MAXSIZE: Final[int] = 50_000
+DEFAULT_TTL: Final[float] = 60.0  # seconds, upper bound of staleness if a message is lost
+RECONNECT_DELAY: Final[float] = 1.0  # seconds, doubled on every failed attempt
+MAX_RECONNECT_DELAY: Final[float] = 30.0
+
+
+class _Invalidation(msgspec.Struct, array_like=True):
+    node_id: str
+    keys: tuple[str, ...]  # Empty tuple means "drop everything"
+
+
+ENCODER: Final[msgspec.msgpack.Encoder] = msgspec.msgpack.Encoder()
+DECODER: Final[msgspec.msgpack.Decoder[_Invalidation]] = msgspec.msgpack.Decoder(_Invalidation)
+
+
+class L1Cache:
+    """
+    Bounded in-process TTL/LRU cache that sits in front of Redis models.
+
+    Every worker subscribes to `INVALIDATION_CHANNEL`, and every `save()`/`delete()` of a cached
+    model publishes the touched keys there, so entries are dropped on all workers. While the
+    subscription is down the cache is bypassed, because invalidations could be missed.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.node_id = uuid4().hex
+        self.epoch = 0  # Bumped on every write and invalidation, see `set`
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._listener: asyncio.Task[None] | None = None
+        self._subscribed = False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any | None:
+        if not self._subscribed:
+            return None
+
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, epoch: int | None = None) -> None:
+        """
+        Store `value` under `key`.
+
+        Pass the `epoch` captured before the value was read from Redis: if a write or an
+        invalidation happened in between, the value may already be stale and is not cached.
+        Without `epoch` the value is a fresh write, reads in flight are made stale.
+        """
+        if epoch is None:
+            self.epoch += 1
+        elif epoch != self.epoch:
+            return
+
+        if not self._subscribed:
+            return
+
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, *keys: str) -> None:
+        self.epoch += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._data.clear()
+
+    def publish(self, pipe: Pipeline, keys: Sequence[str]) -> None:
+        """Queue an invalidation of `keys` (all keys if empty) on other workers into `pipe`."""
+        pipe.publish(INVALIDATION_CHANNEL, ENCODER.encode(_Invalidation(self.node_id, tuple(keys))))
+
+    async def invalidate(self, redis: Redis, keys: Sequence[str]) -> None:
+        if keys:
+            self.pop(*keys)
+        else:
+            self.clear()
+
+        async with redis.pipeline(transaction=False) as pipe:
+            self.publish(pipe, keys)
+            await pipe.execute()
+
+    def _on_message(self, data: bytes) -> None:
+        message = DECODER.decode(data)
+
+        if message.node_id == self.node_id:
+            return
+
+        if message.keys:
+            self.pop(*message.keys)
+        else:
+            self.clear()
+
+    async def _listen(self, redis: Redis) -> None:
+        delay = RECONNECT_DELAY
+
+        while True:
+            try:
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+
+                    # Anything cached before (re)subscribing may have missed invalidations
+                    self.clear()
+                    self._subscribed = True
+                    delay = RECONNECT_DELAY
+
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._on_message(message["data"])
+
+            except RedisConnectionError, RedisTimeoutError:
+                logger.warning("L1 cache invalidation channel lost, reconnecting in %.0fs", delay)
+
+            except Exception:
+                # A bad payload or a server error must not leave the cache bypassed for good
+                logger.exception("L1 cache invalidation listener failed, reconnecting")
+
+            finally:
+                self._subscribed = False
+                self.clear()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def start(self, redis: Redis) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(redis), name="l1-cache-listener")
+
+    async def stop(self) -> None:
+        if self._listener is None:
+            return
+
+        self._listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._listener
+
+        self._listener = None
+
+
+L1_CACHE: Final[L1Cache] = L1Cache()
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Final
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+DEFAULT_SCAN_COUNT: Final[int] = 1000
+
+
+async def delete_by_pattern(redis: Redis, pattern: str, count: int = DEFAULT_SCAN_COUNT) -> int:
+    """
+    Delete keys matching `pattern` without blocking Redis.
+
+    Unlike `KEYS`, `SCAN` walks the keyspace in small steps, and every page of keys is removed
+    with `UNLINK`, which frees memory in a background thread.
+    """
+    deleted = 0
+    batch: list[bytes | str] = []
+
+    async for key in redis.scan_iter(match=pattern, count=count):
+        batch.append(key)
+        if len(batch) >= count:
+            deleted += await redis.unlink(*batch)
+            batch.clear()
+
+    if batch:
+        deleted += await redis.unlink(*batch)
+
+    return deleted
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, cast
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from utils.metrics import REDIS_COMMANDS
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+
+class TracedRedis(Redis):
+    """`Redis` client that counts commands and adds a trace span per command and pipeline."""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        REDIS_COMMANDS.inc(str(args[0]))
+        with span(f"redis.{args[0]}"):
+            # `Redis.execute_command` is not annotated
+            execute_command = cast("Callable[..., Awaitable[Any]]", super().execute_command)
+            return await execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:
+        return TracedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class TracedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        names = [str(args[0]) for args, _ in self.command_stack]
+        for name in names:
+            REDIS_COMMANDS.inc(name)
+
+        commands = " ".join(dict.fromkeys(names))
+        with span(f"redis.pipeline({len(self.command_stack)}) {commands}"):
+            return await super().execute(raise_on_error)
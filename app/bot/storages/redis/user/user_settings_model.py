@@ -1,46 +1,23 @@
-from datetime import timedelta
-from typing import Final, Self
+from typing import ClassVar
 
 import msgspec
-from redis.asyncio import Redis
-from redis.typing import ExpiryT
 
 from storages.psql.user.user_settings_model import Gender
 from storages.psql.utils.alchemy_struct import AlchemyStruct
-
-ENCODER: Final[msgspec.msgpack.Encoder] = msgspec.msgpack.Encoder()
+from storages.redis.base import RedisModel
+from storages.redis.key_schema import RedisKeyPrefix
 
 
 class UserSettingsRD(
-    msgspec.Struct,
+    RedisModel,
     AlchemyStruct["UserSettingsRD"],
     kw_only=True,
     array_like=True,
 ):
+    key_prefix: ClassVar[str] = RedisKeyPrefix.user_settings
+    l1_cached: ClassVar[bool] = True
+
     id: int
     language_code: str = msgspec.field(default="en")
     gender: Gender = msgspec.field(default=Gender.m)
     is_banned: bool = msgspec.field(default=False)
-
-    @classmethod
-    def key(cls, user_id: int | str) -> str:
-        return f"{cls.__name__}:{user_id}"
-
-    @classmethod
-    async def get(cls, redis: Redis, user_id: int | str) -> Self | None:
-        data = await redis.get(cls.key(user_id))
-        if data:
-            return msgspec.msgpack.decode(data, type=cls)
-        return None
-
-    async def save(self, redis: Redis, ttl: ExpiryT = timedelta(days=1)) -> str:
-        return await redis.setex(self.key(self.id), ttl, ENCODER.encode(self))
-
-    @classmethod
-    async def delete(cls, redis: Redis, user_id: int | str) -> int:
-        return await redis.delete(cls.key(user_id))
-
-    @classmethod
-    async def delete_all(cls, redis: Redis) -> int:
-        keys = await redis.keys(f"{cls.__name__}:*")
-        return await redis.delete(*keys)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from storages.redis.key_schema import KEY_SCHEMA, KeySchema
+from utils.signed_callback_data import CALLBACK_SIGNER, CallbackSigner
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator
+
+BOT_TOKEN = "123456789:AAA-AAA_AAAAAAAAAAAAAAAAAAAAAAAAAAAAA"  # noqa: S105
+
+
+@pytest.fixture
+async def redis() -> AsyncIterator[FakeAsyncRedis]:
+    client = FakeAsyncRedis()
+    await client.flushall()
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def key_schema() -> Iterator[KeySchema]:
+    """`KEY_SCHEMA`, settings changed by the test are restored afterwards."""
+    compact, legacy_reads = KEY_SCHEMA.compact, KEY_SCHEMA.legacy_reads
+    yield KEY_SCHEMA
+    KEY_SCHEMA.compact, KEY_SCHEMA.legacy_reads = compact, legacy_reads
+
+
+@pytest.fixture
+def signer() -> Iterator[CallbackSigner]:
+    """`CALLBACK_SIGNER` configured like in `main.configure`."""
+    key = CALLBACK_SIGNER._key
+    CALLBACK_SIGNER.configure(BOT_TOKEN)
+    yield CALLBACK_SIGNER
+    CALLBACK_SIGNER._key = key
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+from aiogram.enums import ChatMemberStatus
+
+from storages.redis.base import ENCODER
+from storages.redis.chat_member.chat_member_model import UNPACKED_HEADER, RDChatMemberModel
+from storages.redis.key_schema import KEY_SCHEMA
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+    from storages.redis.key_schema import KeySchema
+
+CHAT_ID = -1001234567890
+USER_ID = 123456789
+
+MEMBERS = (
+    RDChatMemberModel(chat_id=CHAT_ID, user_id=USER_ID, status=ChatMemberStatus.MEMBER),
+    RDChatMemberModel(
+        chat_id=CHAT_ID,
+        user_id=USER_ID,
+        status=ChatMemberStatus.ADMINISTRATOR,
+        can_be_edited=False,
+        can_delete_messages=True,
+        can_restrict_members=True,
+        can_promote_members=False,
+        custom_title="Moderator",
+    ),
+    RDChatMemberModel(
+        chat_id=CHAT_ID,
+        user_id=USER_ID,
+        status=ChatMemberStatus.RESTRICTED,
+        can_send_messages=True,
+        can_send_photos=False,
+        can_add_web_page_previews=False,
+        until_date=datetime(2030, 1, 2, 3, 4, 5, tzinfo=UTC),
+    ),
+)
+
+
+@pytest.mark.parametrize("member", MEMBERS)
+def test_pack_round_trip(member: RDChatMemberModel) -> None:
+    data = member.pack()
+
+    assert RDChatMemberModel.unpack(CHAT_ID, USER_ID, data) == member
+    assert not RDChatMemberModel.is_outdated(data)
+
+
+def test_pack_keeps_unset_permissions_unset() -> None:
+    member = RDChatMemberModel.unpack(CHAT_ID, USER_ID, MEMBERS[1].pack())
+
+    assert member.can_be_edited is False
+    assert member.can_manage_chat is None
+
+
+@pytest.mark.parametrize("member", MEMBERS)
+def test_unpack_untagged_packed_payload(member: RDChatMemberModel) -> None:
+    # Packed, as stored before payloads were tagged with the version
+    data = member.pack()[2:]
+
+    assert RDChatMemberModel.is_outdated(data)
+    assert RDChatMemberModel.unpack(CHAT_ID, USER_ID, data) == member
+
+
+@pytest.mark.parametrize("member", MEMBERS)
+def test_unpack_unpacked_payload(member: RDChatMemberModel) -> None:
+    # The whole struct, as stored before the packed format
+    data = ENCODER.encode(member)
+
+    assert data[0] == UNPACKED_HEADER
+    assert RDChatMemberModel.is_outdated(data)
+    assert RDChatMemberModel.unpack(CHAT_ID, USER_ID, data) == member
+
+
+def test_load_invalid_payload() -> None:
+    assert RDChatMemberModel.load_field(CHAT_ID, USER_ID, b"\xc1\x01\xff") == (None, False)
+
+
+async def hset(redis: Redis, key: str, field: str, data: bytes) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping={field: data})
+        await pipe.execute()
+
+
+async def hget(redis: Redis, key: str, field: str) -> bytes | None:
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hget(key, field)
+        (data,) = await pipe.execute()
+    return data
+
+
+@pytest.mark.parametrize("member", MEMBERS)
+async def test_save_and_get(redis: Redis, member: RDChatMemberModel) -> None:
+    await member.save(redis)
+
+    assert await RDChatMemberModel.get(redis, CHAT_ID, USER_ID) == member
+    assert await RDChatMemberModel.get_all(redis, CHAT_ID) == {USER_ID: member}
+
+
+async def test_outdated_payload_is_rewritten(redis: Redis) -> None:
+    member, key, field = MEMBERS[1], RDChatMemberModel.key(CHAT_ID), KEY_SCHEMA.part(USER_ID)
+    await hset(redis, key, field, member.pack()[2:])
+
+    assert await RDChatMemberModel.get(redis, CHAT_ID, USER_ID) == member
+    assert await hget(redis, key, field) == member.pack()
+
+
+async def test_legacy_hash(redis: Redis, key_schema: KeySchema) -> None:
+    key_schema.configure(compact=True, legacy_reads=True)
+    member, legacy_key = MEMBERS[0], RDChatMemberModel.legacy_key(CHAT_ID)
+    await hset(redis, legacy_key, str(USER_ID), ENCODER.encode(member))
+
+    assert await RDChatMemberModel.get(redis, CHAT_ID, USER_ID) == member
+    assert await RDChatMemberModel.get_all(redis, CHAT_ID) == {USER_ID: member}
+
+    await member.save(redis)
+
+    assert not await redis.exists(legacy_key)
+
+
+async def test_save_restriction_that_is_over(redis: Redis) -> None:
+    member = MEMBERS[2]
+    await member.save(redis)
+    ended = RDChatMemberModel(
+        chat_id=CHAT_ID,
+        user_id=USER_ID,
+        status=ChatMemberStatus.RESTRICTED,
+        until_date=datetime.now(tz=UTC) - timedelta(minutes=1),
+    )
+
+    assert not await ended.save(redis)
+    assert await RDChatMemberModel.get(redis, CHAT_ID, USER_ID) is None
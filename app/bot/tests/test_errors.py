@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import pytest
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from errors.errors import (
+    ERROR_COUNTERS,
+    BotWasBlockedByUserError,
+    ChatNotFoundError,
+    NotEnoughRightsToSendError,
+    NotEnoughRightsToSendTextError,
+    ResolvableError,
+    resolve_exception,
+)
+
+METHOD = SendMessage(chat_id=1, text="text")
+
+
+def test_exact_message() -> None:
+    error = resolve_exception(TelegramBadRequest(METHOD, "Bad Request: chat not found"))
+
+    assert type(error) is ChatNotFoundError
+    assert error.method is METHOD
+    assert error.message == "Bad Request: chat not found"
+
+
+def test_exact_message_of_other_base() -> None:
+    error = resolve_exception(
+        TelegramForbiddenError(METHOD, "Forbidden: bot was blocked by the user")
+    )
+
+    assert type(error) is BotWasBlockedByUserError
+    assert isinstance(error, TelegramForbiddenError)
+
+
+def test_pattern() -> None:
+    message = "Bad Request: not enough rights to send photos to the chat"
+
+    error = resolve_exception(TelegramBadRequest(METHOD, message))
+
+    assert type(error) is NotEnoughRightsToSendError
+
+
+def test_exact_message_beats_pattern() -> None:
+    message = "Bad Request: not enough rights to send text messages to the chat"
+
+    error = resolve_exception(TelegramBadRequest(METHOD, message))
+
+    assert type(error) is NotEnoughRightsToSendTextError
+
+
+def test_unknown_message() -> None:
+    exception = TelegramBadRequest(METHOD, "Bad Request: something new")
+
+    assert resolve_exception(exception) is exception
+
+
+def test_resolved_error_is_kept() -> None:
+    exception = ChatNotFoundError(METHOD, "Bad Request: chat not found")
+
+    assert resolve_exception(exception) is exception
+
+
+def test_errors_are_counted() -> None:
+    before = ERROR_COUNTERS.copy()
+
+    resolve_exception(TelegramBadRequest(METHOD, "Bad Request: chat not found"))
+    resolve_exception(TelegramBadRequest(METHOD, "Bad Request: something new"))
+
+    assert ERROR_COUNTERS["ChatNotFoundError"] == before["ChatNotFoundError"] + 1
+    assert ERROR_COUNTERS["TelegramBadRequest"] == before["TelegramBadRequest"] + 1
+
+
+def test_resolvable_error_needs_telegram_base() -> None:
+    with pytest.raises(TypeError):
+
+        class _NotTelegramError(ResolvableError, Exception):
+            message = "Bad Request: not a Telegram error"
+
+
+def test_message_collision() -> None:
+    with pytest.raises(ValueError, match="Collision"):
+
+        class _DuplicateError(ResolvableError, TelegramAPIError):
+            message = "Bad Request: chat not found"
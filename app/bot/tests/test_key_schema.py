@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from storages.redis.key_schema import RedisKeyPrefix, pack_id, unpack_id
+
+if TYPE_CHECKING:
+    from storages.redis.key_schema import KeySchema
+
+IDS = (0, 1, 61, 62, 777000, 123456789, -1001234567890, 2**63 - 1)
+
+
+@pytest.mark.parametrize("value", IDS)
+def test_pack_id_round_trip(value: int) -> None:
+    assert unpack_id(pack_id(value)) == value
+
+
+def test_pack_id_is_shorter() -> None:
+    assert pack_id(-1001234567890) == "-hCTkd5o"
+
+
+@pytest.mark.parametrize("value", IDS)
+def test_part_round_trip(key_schema: KeySchema, value: int) -> None:
+    key_schema.compact = True
+
+    part = key_schema.part(value)
+
+    assert part == key_schema.part(str(value))
+    assert key_schema.parse_id(part) == value
+    assert key_schema.parse_id(part.encode()) == value
+
+
+@pytest.mark.parametrize("value", ["007", "-0", "+1", "1.5", "١٢٣", "abc", ""])
+def test_part_keeps_non_canonical_strings(key_schema: KeySchema, value: str) -> None:
+    key_schema.compact = True
+
+    assert key_schema.part(value) == value
+
+
+def test_part_keeps_bools(key_schema: KeySchema) -> None:
+    key_schema.compact = True
+
+    assert key_schema.part(True) == "True"  # noqa: FBT003
+
+
+@pytest.mark.parametrize("value", IDS)
+def test_legacy_part_round_trip(key_schema: KeySchema, value: int) -> None:
+    key_schema.compact = False
+
+    assert key_schema.part(value) == str(value)
+    assert key_schema.parse_id(str(value)) == value
+
+
+def test_key(key_schema: KeySchema) -> None:
+    key_schema.compact = True
+    assert key_schema.key("UserRD", RedisKeyPrefix.user, 123) == "u:1Z"
+
+    key_schema.compact = False
+    assert key_schema.key("UserRD", RedisKeyPrefix.user, 123) == "UserRD:123"
+
+
+def test_configure_keeps_legacy_reads_only_for_compact_keys(key_schema: KeySchema) -> None:
+    key_schema.configure(compact=False, legacy_reads=True)
+
+    assert key_schema.legacy_reads is False
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+from itertools import starmap
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from aiogram.types import Update
+
+from middlewares.outbound_scheduler_middleware import InteractivePriorityMiddleware
+from utils.outbound_scheduler import (
+    OutboundScheduler,
+    Priority,
+    SchedulerClosedError,
+    TokenBucket,
+    outbound_priority,
+)
+
+if TYPE_CHECKING:
+    from aiogram.types import TelegramObject
+
+
+def test_token_bucket_starts_full() -> None:
+    bucket = TokenBucket(rate=2, capacity=3, now=0)
+
+    assert bucket.is_full(0)
+    assert bucket.wait_time(0) == 0
+
+
+def test_token_bucket_wait_and_refill() -> None:
+    bucket = TokenBucket(rate=2, capacity=3, now=0)
+    for _ in range(3):
+        bucket.take(0)
+
+    assert bucket.wait_time(0) == pytest.approx(0.5)
+    assert bucket.wait_time(0.25) == pytest.approx(0.25)
+    assert bucket.wait_time(0.5) == 0
+    assert bucket.is_full(1.5)
+    assert bucket.is_full(100)  # Capped at the capacity
+
+
+def test_token_bucket_pause() -> None:
+    bucket = TokenBucket(rate=2, capacity=3, now=0)
+
+    bucket.pause(0, 5)
+
+    assert bucket.wait_time(0) == 5
+    assert bucket.wait_time(5) == 0
+
+
+async def acquire_in_order(
+    scheduler: OutboundScheduler,
+    requests: list[tuple[int, Priority]],
+) -> list[tuple[int, Priority]]:
+    served = []
+
+    async def send(chat_id: int, priority: Priority) -> None:
+        await scheduler.acquire(chat_id, priority)
+        served.append((chat_id, priority))
+
+    await asyncio.gather(*starmap(send, requests))
+    await scheduler.close()
+    return served
+
+
+async def test_waiters_are_served_by_priority() -> None:
+    requests = [
+        (1, Priority.LOW),
+        (2, Priority.NORMAL),
+        (3, Priority.HIGH),
+        (4, Priority.LOW),
+        (5, Priority.HIGH),
+    ]
+
+    served = await acquire_in_order(OutboundScheduler(), requests)
+
+    # By priority, then in arrival order
+    assert served == [
+        (3, Priority.HIGH),
+        (5, Priority.HIGH),
+        (2, Priority.NORMAL),
+        (1, Priority.LOW),
+        (4, Priority.LOW),
+    ]
+
+
+async def test_cooling_chat_does_not_block_other_chats() -> None:
+    scheduler = OutboundScheduler(private_rate=20)
+    await scheduler.acquire(1, Priority.NORMAL)
+
+    served = await acquire_in_order(scheduler, [(1, Priority.HIGH), (2, Priority.LOW)])
+
+    assert served == [(2, Priority.LOW), (1, Priority.HIGH)]
+
+
+async def test_close_fails_waiters_and_new_senders() -> None:
+    scheduler = OutboundScheduler(private_rate=0.1)
+    await scheduler.acquire(1, Priority.NORMAL)
+    waiter = asyncio.create_task(scheduler.acquire(1, Priority.NORMAL))
+    await asyncio.sleep(0.01)
+
+    await scheduler.close()
+
+    with pytest.raises(SchedulerClosedError):
+        await waiter
+    with pytest.raises(SchedulerClosedError):
+        await scheduler.acquire(2, Priority.HIGH)
+
+
+async def test_handlers_send_with_high_priority() -> None:
+    async def handler(_: TelegramObject, __: dict[str, Any]) -> Priority:
+        return outbound_priority.get()
+
+    priority = await InteractivePriorityMiddleware()(handler, Update(update_id=1), {})
+
+    assert priority is Priority.HIGH
+    assert outbound_priority.get() is Priority.NORMAL
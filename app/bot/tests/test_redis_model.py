@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import ClassVar
+
+import msgspec
+
+from filters.cb_click_by_user import MsgOwner
+from storages.redis.base import RedisModel, encode_versioned
+
+
+class _NoteV0(msgspec.Struct, array_like=True):
+    text: str
+
+
+class _Note(RedisModel, array_like=True):
+    key_prefix: ClassVar[str] = "note"
+    schema_version: ClassVar[int] = 1
+    schema_history: ClassVar = MappingProxyType({0: _NoteV0})
+
+    text: str
+    pinned: bool = False
+
+
+def test_load_current() -> None:
+    model = MsgOwner(owner_id=123456789)
+
+    assert MsgOwner.load(model.encode()) == (model, False)
+
+
+def test_load_outdated() -> None:
+    data = encode_versioned(_NoteV0(text="text"), 0)
+
+    assert _Note.load(data) == (_Note(text="text"), True)
+
+
+def test_load_invalid_payload() -> None:
+    assert _Note.load(encode_versioned(["text", "not a bool"], 1)) == (None, False)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from time import time
+
+import pytest
+
+from utils.callback_datas import PossibleLanguages, SelectLanguageCB
+from utils.signed_callback_data import CallbackSigner, SignedOwnerCallbackData
+
+OWNER_ID = 123456789
+EXPIRES = 2_000_000_000
+
+
+@pytest.mark.usefixtures("signer")
+def test_pack_round_trip() -> None:
+    packed = SelectLanguageCB(
+        owner_id=OWNER_ID, expires=EXPIRES, language=PossibleLanguages.uk
+    ).pack()
+
+    unpacked = SelectLanguageCB.unpack(packed)
+
+    assert SelectLanguageCB.is_signed(packed)
+    assert unpacked.owner_id == OWNER_ID
+    assert unpacked.expires == EXPIRES
+    assert unpacked.language is PossibleLanguages.uk
+
+
+@pytest.mark.usefixtures("signer")
+def test_template_packs_like_model() -> None:
+    model = SelectLanguageCB(owner_id=OWNER_ID, expires=EXPIRES, language=PossibleLanguages.en)
+    template = SelectLanguageCB.template(language=PossibleLanguages.en)
+
+    assert template.pack(OWNER_ID, EXPIRES) == model.pack()
+
+
+@pytest.mark.usefixtures("signer")
+@pytest.mark.parametrize(
+    ("field", "value"),
+    [(2, str(OWNER_ID + 1)), (3, str(EXPIRES + 1)), (4, PossibleLanguages.uk.value)],
+)
+def test_tampered_data_is_not_signed(field: int, value: str) -> None:
+    packed = SelectLanguageCB(
+        owner_id=OWNER_ID, expires=EXPIRES, language=PossibleLanguages.en
+    ).pack()
+    parts = packed.split(SelectLanguageCB.__separator__)
+    parts[field] = value
+
+    assert not SelectLanguageCB.is_signed(SelectLanguageCB.__separator__.join(parts))
+
+
+def test_signature_depends_on_secret(signer: CallbackSigner) -> None:
+    packed = SelectLanguageCB(
+        owner_id=OWNER_ID, expires=EXPIRES, language=PossibleLanguages.en
+    ).pack()
+
+    signer.configure("987654321:BBB-BBB_BBBBBBBBBBBBBBBBBBBBBBBBBBBBB")
+
+    assert not SelectLanguageCB.is_signed(packed)
+
+
+@pytest.mark.usefixtures("signer")
+def test_expired() -> None:
+    assert SelectLanguageCB(
+        owner_id=OWNER_ID, expires=int(time()) - 1, language=PossibleLanguages.en
+    ).expired
+    assert not SelectLanguageCB(owner_id=OWNER_ID, language=PossibleLanguages.en).expired
+
+
+def test_unconfigured_signer() -> None:
+    with pytest.raises(RuntimeError):
+        CallbackSigner().sign("data")
+
+
+@pytest.mark.usefixtures("signer")
+def test_too_long_data() -> None:
+    class LongCB(SignedOwnerCallbackData, prefix="long"):
+        text: str
+
+    with pytest.raises(ValueError, match="too long"):
+        LongCB(owner_id=OWNER_ID, text="x" * 64).pack()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+class Loader:
+    def __init__(self, result: str = "loaded", delay: float = 0.01) -> None:
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+async def test_concurrent_callers_share_one_load() -> None:
+    flight: SingleFlight[int, str] = SingleFlight("test")
+    loader = Loader()
+
+    results = await asyncio.gather(*(flight.do(1, loader) for _ in range(5)))
+
+    assert results == ["loaded"] * 5
+    assert loader.calls == 1
+    assert len(flight) == 0
+
+
+async def test_keys_are_loaded_separately() -> None:
+    flight: SingleFlight[int, str] = SingleFlight("test")
+    loader = Loader()
+
+    await asyncio.gather(flight.do(1, loader), flight.do(2, loader))
+
+    assert loader.calls == 2
+
+
+async def test_sequential_callers_load_again() -> None:
+    flight: SingleFlight[int, str] = SingleFlight("test")
+    loader = Loader()
+
+    await flight.do(1, loader)
+    await flight.do(1, loader)
+
+    assert loader.calls == 2
+
+
+async def test_error_is_raised_to_every_caller() -> None:
+    flight: SingleFlight[int, str] = SingleFlight("test")
+
+    async def failing() -> str:
+        await asyncio.sleep(0.01)
+        msg = "database is down"
+        raise RuntimeError(msg)
+
+    results = await asyncio.gather(
+        *(flight.do(1, failing) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
+
+
+async def test_follower_takes_over_from_cancelled_leader() -> None:
+    flight: SingleFlight[int, str] = SingleFlight("test")
+    slow, fast = Loader("slow", delay=10), Loader("fast")
+
+    leader = asyncio.create_task(flight.do(1, slow))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do(1, fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "fast"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_load_under_redis_lock(redis: Redis) -> None:
+    flight: SingleFlight[int, str] = SingleFlight("test")
+    loader = Loader()
+
+    assert await flight.do(1, loader, redis=redis) == "loaded"
+    assert not await redis.exists(flight.lock_key(1))
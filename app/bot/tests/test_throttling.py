@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from middlewares.throttling_middleware import Throttler, ThrottleVerdict
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+LIMIT = 4
+PERIOD = timedelta(seconds=7)
+INTERVAL_MS = int(PERIOD.total_seconds() * 1000) // LIMIT
+
+
+async def spend(throttler: Throttler, user_id: int, times: int) -> list[ThrottleVerdict]:
+    # Distinct throttle keys, so only the bucket limits the updates
+    return [
+        (await throttler.check(user_id, time_ms=100, throttle_key=f"key-{i}"))[0]
+        for i in range(times)
+    ]
+
+
+async def test_bucket_allows_limit_per_period(redis: Redis) -> None:
+    throttler = Throttler(redis, LIMIT, PERIOD)
+
+    verdicts = await spend(throttler, 1, LIMIT + 1)
+
+    assert verdicts == [ThrottleVerdict.ALLOWED] * LIMIT + [ThrottleVerdict.BUCKET_EMPTY]
+
+
+async def test_empty_bucket_ttl_is_one_interval(redis: Redis) -> None:
+    throttler = Throttler(redis, LIMIT, PERIOD, lease_size=1)
+    await spend(throttler, 1, LIMIT)
+
+    verdict, ttl = await Throttler(redis, LIMIT, PERIOD).check(1, time_ms=100, throttle_key="x")
+
+    assert verdict is ThrottleVerdict.BUCKET_EMPTY
+    assert 0 < ttl <= INTERVAL_MS
+
+
+async def test_budget_is_exact_across_workers(redis: Redis) -> None:
+    workers = [Throttler(redis, LIMIT, PERIOD), Throttler(redis, LIMIT, PERIOD)]
+
+    verdicts = [
+        (await workers[i % 2].check(1, time_ms=100, throttle_key=f"key-{i}"))[0]
+        for i in range(LIMIT * 2)
+    ]
+
+    assert verdicts.count(ThrottleVerdict.ALLOWED) == LIMIT
+
+
+async def test_users_have_own_buckets(redis: Redis) -> None:
+    throttler = Throttler(redis, LIMIT, PERIOD)
+    await spend(throttler, 1, LIMIT)
+
+    assert await spend(throttler, 2, LIMIT) == [ThrottleVerdict.ALLOWED] * LIMIT
+
+
+async def test_cooldown_of_throttle_key(redis: Redis) -> None:
+    throttler = Throttler(redis, LIMIT, PERIOD)
+
+    first, _ = await throttler.check(1, time_ms=1000, throttle_key="cmd")
+    second, ttl = await throttler.check(1, time_ms=1000, throttle_key="cmd")
+
+    assert first is ThrottleVerdict.ALLOWED
+    assert second is ThrottleVerdict.COOLDOWN
+    assert 0 < ttl <= 1000
+
+
+async def test_cooldown_is_checked_in_redis_by_other_workers(redis: Redis) -> None:
+    await Throttler(redis, LIMIT, PERIOD).check(1, time_ms=1000, throttle_key="cmd")
+
+    verdict, _ = await Throttler(redis, LIMIT, PERIOD).check(1, time_ms=1000, throttle_key="cmd")
+
+    assert verdict is ThrottleVerdict.COOLDOWN
+
+
+async def test_free_update_without_lease(redis: Redis) -> None:
+    # With one cell nothing is leased for a free update, the TAT stays at now and the script
+    # must still set a positive TTL
+    throttler = Throttler(redis, 1, PERIOD)
+
+    verdict, _ = await throttler.check(1, time_ms=100, bucket_decrement=0)
+
+    assert verdict is ThrottleVerdict.ALLOWED
+
+
+async def test_lease_over_admission_is_bounded(redis: Redis) -> None:
+    # Cells spent from a lease don't set the cooldown in Redis, so another worker misses it
+    leasing, other = Throttler(redis, LIMIT, PERIOD, lease_size=2), Throttler(redis, LIMIT, PERIOD)
+    await leasing.check(1, time_ms=1000, throttle_key="a")
+    await leasing.check(1, time_ms=1000, throttle_key="b")  # Spent from the lease
+
+    verdict, _ = await other.check(1, time_ms=1000, throttle_key="b")
+
+    assert verdict is ThrottleVerdict.ALLOWED
+    # The lease is spent, the next update goes to Redis and sees the cooldown
+    verdict, _ = await leasing.check(1, time_ms=1000, throttle_key="c")
+    assert verdict is ThrottleVerdict.ALLOWED
+    verdict, _ = await other.check(1, time_ms=1000, throttle_key="c")
+    assert verdict is ThrottleVerdict.COOLDOWN
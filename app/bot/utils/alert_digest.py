@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from html import escape
+from typing import TYPE_CHECKING, Final
+
+from aiogram.exceptions import TelegramAPIError
+
+from utils.outbound_scheduler import Priority, use_priority
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW: Final[float] = 60.0  # seconds between digests
+DEFAULT_BUFFER_SIZE: Final[int] = 1000  # alerts kept for `/alerts`
+SAMPLE_IDS: Final[int] = 3  # alert ids shown per signature in a digest
+MAX_SIGNATURES: Final[int] = 20  # signatures listed in one digest, keeps it under 4096 chars
+
+
+@dataclass(slots=True)
+class Alert:
+    signature: str
+    details: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created_at: datetime = field(default_factory=lambda: datetime.now(tz=UTC))
+
+
+@dataclass(slots=True)
+class _Group:
+    count: int = 0
+    samples: list[str] = field(default_factory=list)
+
+
+class AlertDigest:
+    """
+    Groups developer alerts by signature and sends at most one digest per `window` seconds.
+
+    A digest has the number of alerts per signature and a few sample ids. Full details of the
+    last `buffer_size` alerts stay in memory and are shown by `/alerts`.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        developer_id: int,
+        window: float = DEFAULT_WINDOW,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ) -> None:
+        self.bot = bot
+        self.developer_id = developer_id
+        self.window = window
+        self.alerts: deque[Alert] = deque(maxlen=buffer_size)
+        self._pending: dict[str, _Group] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def add(self, signature: str, details: str) -> Alert:
+        alert = Alert(signature, details)
+        self.alerts.append(alert)
+
+        group = self._pending.setdefault(signature, _Group())
+        group.count += 1
+        if len(group.samples) < SAMPLE_IDS:
+            group.samples.append(alert.id)
+
+        return alert
+
+    def find(self, alert_id: str) -> Alert | None:
+        return next((alert for alert in reversed(self.alerts) if alert.id == alert_id), None)
+
+    def render(self, pending: dict[str, _Group]) -> str:
+        groups = sorted(pending.items(), key=lambda item: item[1].count, reverse=True)
+        lines = [f"🚨 Alerts in the last {self.window:.0f}s: {sum(g.count for _, g in groups)}"]
+
+        for signature, group in groups[:MAX_SIGNATURES]:
+            samples = ", ".join(f"<code>{alert_id}</code>" for alert_id in group.samples)
+            lines.append(f"{group.count} × {escape(signature)} ({samples})")
+
+        if len(groups) > MAX_SIGNATURES:
+            lines.append(f"...and {len(groups) - MAX_SIGNATURES} more signatures")
+
+        lines.append("Details: /alerts &lt;id&gt;")
+        return "\n".join(lines)
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+
+        try:
+            with use_priority(Priority.LOW):
+                await self.bot.send_message(self.developer_id, self.render(pending))
+
+        except TelegramAPIError:
+            logger.exception("Failed to send a digest of %d alert signatures", len(pending))
+            return 0
+
+        return len(pending)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.window)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="alert-digest")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        await self.flush()
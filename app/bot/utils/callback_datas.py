@@ -6,6 +6,7 @@
 from aiogram.filters.callback_data import CallbackData
 
 from utils.callback_data_prefix_enums import CallbackDataPrefix
+from utils.signed_callback_data import SignedOwnerCallbackData
 
 # Type that is a subclass of CallbackData and has an owner_id attribute of type int
 OwnerCallbackData = TypeVar("OwnerCallbackData", bound=CallbackData)
@@ -17,9 +18,9 @@ class PossibleLanguages(Enum):
     uk = "uk"  # Ukrainian
 
 
-class LanguageWindowCB(CallbackData, prefix=CallbackDataPrefix.language_window):
+class LanguageWindowCB(SignedOwnerCallbackData, prefix=CallbackDataPrefix.language_window):
     pass
 
 
-class SelectLanguageCB(CallbackData, prefix=CallbackDataPrefix.select_language):
+class SelectLanguageCB(SignedOwnerCallbackData, prefix=CallbackDataPrefix.select_language):
     language: PossibleLanguages
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+from typing import TYPE_CHECKING, Any, Final, cast
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram_i18n.cores import FluentRuntimeCore
+
+from filters.lazy_filter import LAZY_FILTER_INDEX
+from utils.signed_callback_data import default_expires
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from aiogram_i18n import I18nMiddleware
+    from fluent.runtime import FluentBundle
+
+    from stub import I18nContext
+    from utils.signed_callback_data import SignedTemplate
+
+    type KeyboardRows = Sequence[Sequence[tuple[str, SignedTemplate]]]
+
+logger = logging.getLogger(__name__)
+
+
+class CachedFluentRuntimeCore(FluentRuntimeCore):
+    """
+    `FluentRuntimeCore` that renders messages without arguments once per locale at startup.
+
+    `get` without arguments (`_path` is only used by FTL-Extract) returns the rendered text.
+    `reload` reads the `.ftl` files again in a thread and swaps bundles and texts at once.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.texts: dict[str, dict[str, str]] = {}
+        self._reload_lock = asyncio.Lock()
+
+    @staticmethod
+    def _render_static(bundle: FluentBundle) -> dict[str, str]:
+        texts = {}
+        for message_id in bundle._messages:  # noqa: SLF001
+            if (message := bundle.get_message(message_id)).value is None:
+                continue
+
+            # Messages that use variables fail to render without them
+            text, errors = bundle.format_pattern(message.value, {})
+            if not errors and isinstance(text, str):
+                texts[message_id] = text
+        return texts
+
+    async def startup(self) -> None:
+        await super().startup()
+        self.texts = {
+            locale: self._render_static(bundle) for locale, bundle in self.locales.items()
+        }
+
+    def _load(self) -> tuple[dict[str, FluentBundle], dict[str, dict[str, str]]]:
+        locales = self.find_locales()
+        return locales, {locale: self._render_static(bundle) for locale, bundle in locales.items()}
+
+    async def reload(self) -> None:
+        async with self._reload_lock:
+            # Parsing and compiling bundles blocks, handlers keep using the old ones meanwhile
+            self.locales, self.texts = await asyncio.to_thread(self._load)
+
+    async def shutdown(self) -> None:
+        await super().shutdown()
+        self.texts = {}
+
+    def get(self, message_id: str, locale: str | None = None, /, **kwargs: Any) -> str:
+        if kwargs.keys() <= {"_path"}:
+            texts = self.texts.get(self.get_locale(locale), {})
+            if (text := texts.get(message_id)) is not None:
+                return text
+
+        with span(f"fluent {message_id}"):
+            return super().get(message_id, locale, **kwargs)
+
+
+class CachedKeyboard:
+    """Inline keyboard of owner-signed buttons with prerendered texts and packed fields."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: KeyboardRows) -> None:
+        self.rows = tuple(tuple(row) for row in rows)
+
+    def markup(self, owner_id: int) -> InlineKeyboardMarkup:
+        # Texts and callback data are valid already, no need to validate them again
+        expires = default_expires()
+        return InlineKeyboardMarkup.model_construct(
+            inline_keyboard=[
+                [
+                    InlineKeyboardButton.model_construct(
+                        text=text,
+                        callback_data=template.pack(owner_id, expires),
+                    )
+                    for text, template in row
+                ]
+                for row in self.rows
+            ],
+        )
+
+
+class KeyboardCache:
+    """
+    Keyboards that depend only on the locale, built once per locale.
+
+    `register` turns a builder of rows (button text, `SignedTemplate`) into a function that
+    returns the markup of the current locale for an owner. Keyboards are built for all locales
+    by `build`, and lazily for a locale that wasn't built yet.
+    """
+
+    def __init__(self) -> None:
+        self._builders: list[Callable[[I18nContext], KeyboardRows]] = []
+        self._keyboards: dict[
+            tuple[Callable[[I18nContext], KeyboardRows], str], CachedKeyboard
+        ] = {}
+
+    def _build(
+        self, builder: Callable[[I18nContext], KeyboardRows], i18n: I18nContext
+    ) -> CachedKeyboard:
+        keyboard = self._keyboards[builder, i18n.locale] = CachedKeyboard(builder(i18n))
+        return keyboard
+
+    def register(
+        self, builder: Callable[[I18nContext], KeyboardRows]
+    ) -> Callable[[I18nContext, int], InlineKeyboardMarkup]:
+        self._builders.append(builder)
+
+        def markup(i18n: I18nContext, owner_id: int) -> InlineKeyboardMarkup:
+            if (keyboard := self._keyboards.get((builder, i18n.locale))) is None:
+                keyboard = self._build(builder, i18n)
+            return keyboard.markup(owner_id)
+
+        return markup
+
+    def build(self, i18n: I18nContext) -> None:
+        """Build all keyboards for every available locale, replacing the previous ones."""
+        self._keyboards.clear()
+        for locale in i18n.core.available_locales:
+            with i18n.use_locale(locale):
+                for builder in self._builders:
+                    self._build(builder, i18n)
+
+
+KEYBOARD_CACHE: Final[KeyboardCache] = KeyboardCache()
+
+
+def build_locale_caches(i18n_middleware: I18nMiddleware) -> None:
+    """Build caches that depend on translations, on startup and after a reload."""
+    if (locale := i18n_middleware.core.default_locale) is None:
+        msg = "Default locale is not set, call `I18nMiddleware.setup` first"
+        raise RuntimeError(msg)
+
+    KEYBOARD_CACHE.build(cast("I18nContext", i18n_middleware.new_context(locale, {})))
+    LAZY_FILTER_INDEX.build(i18n_middleware.core)
+
+
+async def reload_locales(i18n_middleware: I18nMiddleware) -> None:
+    """Reload translations of a `CachedFluentRuntimeCore` and rebuild caches that depend on them."""
+    core = i18n_middleware.core
+    if not isinstance(core, CachedFluentRuntimeCore):
+        msg = f"Can't reload locales of {type(core).__name__}"
+        raise TypeError(msg)
+
+    await core.reload()
+    build_locale_caches(i18n_middleware)
+
+    logger.info("Locales reloaded: %s", ", ".join(core.available_locales))
+
+
+_reload_tasks: set[asyncio.Task[None]] = set()
+
+
+def _log_reload_error(task: asyncio.Task[None]) -> None:
+    _reload_tasks.discard(task)
+    if not task.cancelled() and (exc := task.exception()):
+        logger.error("Can't reload locales", exc_info=exc)
+
+
+def reload_locales_on_signal(i18n_middleware: I18nMiddleware) -> None:
+    """Reload locales on `SIGHUP`, like `kill -HUP <pid>` (not available on Windows)."""
+    if not hasattr(signal, "SIGHUP"):
+        return
+
+    def reload() -> None:
+        task = asyncio.create_task(reload_locales(i18n_middleware), name="reload-locales")
+        _reload_tasks.add(task)
+        task.add_done_callback(_log_reload_error)
+
+    asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload)
+
+
+__all__ = (
+    "KEYBOARD_CACHE",
+    "CachedFluentRuntimeCore",
+    "CachedKeyboard",
+    "KeyboardCache",
+    "build_locale_caches",
+    "reload_locales",
+    "reload_locales_on_signal",
+)
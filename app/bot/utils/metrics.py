@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import TYPE_CHECKING, Final
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Mapping
+
+type LabelValues = tuple[str, ...]
+
+# Seconds, from a Redis hit to a slow Bot API call
+DEFAULT_BUCKETS: Final[tuple[float, ...]] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    kind: str
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]: ...
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}_total{_labels(self.label_names, labels)} {value}"
+
+
+class Gauge(Metric):
+    """Metric read from `collect` on every scrape, (label values) -> value."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Mapping[LabelValues, float]],
+        labels: tuple[str, ...] = (),
+        kind: str = "gauge",  # Or "counter" for totals kept elsewhere
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> Iterator[str]:
+        name = f"{self.name}_total" if self.kind == "counter" else self.name
+        for labels, value in self.collect().items():
+            yield f"{name}{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        # Label values -> per-bucket counts (the last one is +Inf), sum
+        self.values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if (series := self.values.get(labels)) is None:
+            series = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, *labels)
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {total[0]}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Metrics in the Prometheus text format, without the `prometheus_client` dependency.
+
+    Metrics are only updated from the event loop, so they don't need locks.
+    """
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self.metrics: dict[str, Metric] = {}
+
+    def _add[M: Metric](self, metric: M) -> M:
+        if metric.name in self.metrics:
+            msg = f"Collision detected for metric: {metric.name}"
+            raise ValueError(msg)
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(f"{self.namespace}_{name}", documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Histogram:
+        return self._add(Histogram(f"{self.namespace}_{name}", documentation, labels))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Mapping[LabelValues, float]],
+        labels: tuple[str, ...] = (),
+        kind: str = "gauge",
+    ) -> Gauge:
+        return self._add(Gauge(f"{self.namespace}_{name}", documentation, collect, labels, kind))
+
+    def render(self) -> str:
+        return (
+            "\n".join(line for metric in self.metrics.values() for line in metric.render()) + "\n"
+        )
+
+    async def handle(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def serve(self, host: str, port: int) -> web.AppRunner:
+        """Serve `/metrics` on its own port, apart from the webhook app and its `IPFilter`."""
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+METRICS: Final[MetricsRegistry] = MetricsRegistry("bot")
+
+UPDATE_SECONDS: Final[Histogram] = METRICS.histogram(
+    "update_seconds", "Time to process an update", ("type",)
+)
+MIDDLEWARE_SECONDS: Final[Histogram] = METRICS.histogram(
+    "middleware_seconds", "Time spent in a middleware itself, without the inner handlers", ("name",)
+)
+HANDLER_SECONDS: Final[Histogram] = METRICS.histogram(
+    "handler_seconds", "Time spent in a handler", ("event", "handler")
+)
+REDIS_MODEL_READS: Final[Counter] = METRICS.counter(
+    "redis_model_reads", "Redis model reads by source: l1, redis or miss", ("model", "result")
+)
+REDIS_COMMANDS: Final[Counter] = METRICS.counter(
+    "redis_commands", "Redis commands sent, pipelined ones included", ("command",)
+)
+SQL_STATEMENTS: Final[Counter] = METRICS.counter("sql_statements", "SQL statements executed")
+BOT_API_REQUESTS: Final[Counter] = METRICS.counter(
+    "bot_api_requests", "Bot API requests made", ("method",)
+)
+
+__all__ = (
+    "BOT_API_REQUESTS",
+    "HANDLER_SECONDS",
+    "METRICS",
+    "MIDDLEWARE_SECONDS",
+    "REDIS_COMMANDS",
+    "REDIS_MODEL_READS",
+    "SQL_STATEMENTS",
+    "UPDATE_SECONDS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+)
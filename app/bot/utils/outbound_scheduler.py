@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from time import monotonic
+from typing import TYPE_CHECKING, Final
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this
+GLOBAL_RATE: Final[float] = 30.0  # messages per second for the whole bot
+PRIVATE_RATE: Final[float] = 1.0  # messages per second in one private chat
+GROUP_RATE: Final[float] = 20 / 60  # messages per second in one group
+GROUP_BURST: Final[int] = 3
+IDLE_BUCKETS_LIMIT: Final[int] = 10_000  # prune full per-chat buckets above this size
+
+
+class SchedulerClosedError(RuntimeError):
+    pass
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+outbound_priority: ContextVar[Priority] = ContextVar("outbound_priority", default=Priority.NORMAL)
+
+
+@contextmanager
+def use_priority(priority: Priority) -> Iterator[None]:
+    """Send requests made inside the block through the `priority` lane."""
+    token = outbound_priority.set(priority)
+    try:
+        yield
+    finally:
+        outbound_priority.reset(token)
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now: float, seconds: float) -> None:
+        """Make the bucket wait at least `seconds` before the next token."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+@dataclass(order=True, slots=True)
+class _Waiter:
+    priority: Priority
+    seq: int
+    chat_id: int | str | None = field(compare=False)
+    future: asyncio.Future[None] = field(compare=False)
+
+
+class OutboundScheduler:
+    """
+    Spaces out outgoing messages to stay within Telegram's global and per-chat limits.
+
+    Senders wait in `acquire` until both the global bucket and the bucket of their chat have a
+    token. Waiters are served in priority order, but a waiter whose chat is still cooling down
+    doesn't block waiters for other chats. `pause` is used for `retry_after` answers.
+    After `close`, waiting and new senders get `SchedulerClosedError`.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        private_rate: float = PRIVATE_RATE,
+        group_rate: float = GROUP_RATE,
+        group_burst: int = GROUP_BURST,
+    ) -> None:
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self._global = TokenBucket(global_rate, global_rate, monotonic())
+        self._chats: dict[int | str, TokenBucket] = {}
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._closed = False
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def queue_depth_by_priority(self) -> dict[Priority, int]:
+        depth = dict.fromkeys(Priority, 0)
+        for waiter in self._waiters:
+            depth[waiter.priority] += 1
+        return depth
+
+    def _chat_bucket(self, chat_id: int | str | None, now: float) -> TokenBucket | None:
+        if chat_id is None:
+            return None
+
+        if (bucket := self._chats.get(chat_id)) is None:
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self.private_rate, 1, now)
+            else:  # Groups, supergroups and channels, including `@username` ids
+                bucket = TokenBucket(self.group_rate, self.group_burst, now)
+            self._chats[chat_id] = bucket
+
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        if len(self._chats) > IDLE_BUCKETS_LIMIT:
+            waiting = {waiter.chat_id for waiter in self._waiters}
+            self._chats = {
+                chat_id: bucket
+                for chat_id, bucket in self._chats.items()
+                if chat_id in waiting or not bucket.is_full(now)
+            }
+
+    def pause(self, chat_id: int | str | None, seconds: float) -> None:
+        now = monotonic()
+        bucket = self._chat_bucket(chat_id, now) or self._global
+        bucket.pause(now, seconds)
+
+    def _grant(self) -> float | None:
+        """Release the best ready waiter, return how long to sleep if nobody is ready."""
+        now = monotonic()
+
+        if (delay := self._global.wait_time(now)) > 0:
+            return delay
+
+        self._waiters = [waiter for waiter in self._waiters if not waiter.future.done()]
+        self._waiters.sort()
+
+        for waiter in self._waiters:
+            bucket = self._chat_bucket(waiter.chat_id, now)
+            chat_delay = bucket.wait_time(now) if bucket else 0.0
+
+            if chat_delay <= 0:
+                self._global.take(now)
+                if bucket:
+                    bucket.take(now)
+                self._waiters.remove(waiter)
+                waiter.future.set_result(None)
+                return 0.0
+
+            delay = chat_delay if delay <= 0 else min(delay, chat_delay)
+
+        self._prune(now)
+        return delay if self._waiters else None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = self._grant()
+
+            if delay == 0:
+                continue
+
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+
+    async def acquire(self, chat_id: int | str | None, priority: Priority) -> None:
+        if self._closed:
+            msg = "Outbound scheduler is closed"
+            raise SchedulerClosedError(msg)
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="outbound-scheduler")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(_Waiter(priority, next(self._seq), chat_id, future))
+        self._wakeup.set()
+
+        await future
+
+    async def close(self) -> None:
+        self._closed = True
+
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        for waiter in self._waiters:
+            if not waiter.future.done():
+                waiter.future.set_exception(SchedulerClosedError("Outbound scheduler is closed"))
+        self._waiters.clear()
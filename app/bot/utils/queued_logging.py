@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import copy
+import logging
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import Full, Queue
+from time import monotonic
+from typing import TYPE_CHECKING, Final
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+QUEUE_SIZE: Final[int] = 10_000  # records waiting for the writer thread, newer ones are dropped
+MAX_BYTES: Final[int] = 10 * 1024 * 1024
+BACKUP_COUNT: Final[int] = 5
+SAMPLE_WINDOW: Final[float] = 60.0  # seconds
+SAMPLE_BURST: Final[int] = 5  # records of one kind written per window, the rest are counted
+SAMPLE_KINDS_LIMIT: Final[int] = 10_000  # forget kinds of past windows above this size
+
+
+class SampledFormatter(logging.Formatter):
+    """Appends the number of records `DuplicateSampler` suppressed before this one."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        if suppressed := getattr(record, "suppressed", 0):
+            text = f"{text.rstrip()}\n({suppressed} similar records suppressed)\n"
+        return text
+
+
+FORMATTER: Final[logging.Formatter] = SampledFormatter(
+    "%(levelname)s:%(name)s - %(asctime)s - on line `%(lineno)d`\n%(message)s\n",
+)
+
+
+class DuplicateSampler(logging.Filter):
+    """
+    Lets through `burst` records of one kind per `window` seconds and counts the rest.
+
+    The kind is the `sample_key` extra of a record, or its logger and message template. The
+    first record of the next window gets the number of suppressed ones as its `suppressed`
+    attribute, rendered by `SampledFormatter` in the writer thread.
+    """
+
+    def __init__(self, window: float = SAMPLE_WINDOW, burst: int = SAMPLE_BURST) -> None:
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.suppressed_total = 0
+        self._windows: dict[object, tuple[float, int, int]] = {}  # started, passed, suppressed
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None) or (record.name, record.msg)
+        now = monotonic()
+        started, passed, suppressed = self._windows.get(key, (now, 0, 0))
+
+        if now - started >= self.window:
+            if len(self._windows) > SAMPLE_KINDS_LIMIT:
+                self._windows = {k: v for k, v in self._windows.items() if now - v[0] < self.window}
+            started, passed = now, 0
+            if suppressed:
+                record.suppressed = suppressed
+                suppressed = 0
+
+        if passed >= self.burst:
+            self._windows[key] = (started, passed, suppressed + 1)
+            self.suppressed_total += 1
+            return False
+
+        self._windows[key] = (started, passed + 1, suppressed)
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """`QueueHandler` that drops records when the queue is full and formats nothing itself."""
+
+    def __init__(self, queue: Queue[logging.LogRecord]) -> None:
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting (and `repr` of the args) happens in the writer thread
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class QueuedLog:
+    """
+    Writes records of attached loggers to a rotating file and stderr from a dedicated thread.
+
+    Records only pass `DuplicateSampler` and are put into a bounded queue on the event loop, so
+    a burst of errors can't stall update processing on disk I/O.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = MAX_BYTES,
+        backup_count: int = BACKUP_COUNT,
+        queue_size: int = QUEUE_SIZE,
+        formatter: logging.Formatter = FORMATTER,
+        stderr: bool = True,
+        sample: bool = True,
+    ) -> None:
+        self.sampler = DuplicateSampler()
+        self.handler = BoundedQueueHandler(Queue(queue_size))
+        if sample:
+            self.handler.addFilter(self.sampler)
+
+        file_handler = RotatingFileHandler(
+            path,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        handlers: list[logging.Handler] = [file_handler]
+        if stderr:
+            handlers.append(logging.StreamHandler(sys.stderr))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        self.listener = QueueListener(self.handler.queue, *handlers, respect_handler_level=True)
+
+    def attach(self, logger: logging.Logger) -> None:
+        """Send records of `logger` through the queue only, instead of the root handlers."""
+        logger.addHandler(self.handler)
+        logger.propagate = False
+
+    def start(self) -> None:
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Write out the queued records and stop the writer thread."""
+        self.listener.stop()
+        if self.handler.dropped:
+            logging.getLogger(__name__).warning(
+                "%d log records were dropped, the queue was full", self.handler.dropped
+            )
+
+
+ERRORS_LOG: Final[QueuedLog] = QueuedLog("errors.log")
+
+__all__ = ("ERRORS_LOG", "BoundedQueueHandler", "DuplicateSampler", "QueuedLog", "SampledFormatter")
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import TYPE_CHECKING, Final
+
+from redis.exceptions import LockError
+
+from storages.redis.key_schema import KEY_SCHEMA, RedisKeyPrefix
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+    from redis.asyncio import Redis
+
+DEFAULT_LOCK_TIMEOUT: Final[float] = 5.0  # seconds
+
+
+class SingleFlight[K: Hashable, V]:
+    """
+    Runs at most one loader per key at a time, concurrent callers await the same result.
+
+    Inside one process callers share an `asyncio.Future`. If `redis` is passed to `do`, the
+    loader also runs under a short Redis lock, so workers don't load the same key in parallel
+    either. That's why a loader should check the cache again before hitting the database: it
+    may have been filled by another worker while the lock was held. If the lock can't be
+    acquired in `lock_timeout`, the loader runs anyway.
+    """
+
+    def __init__(self, name: str, lock_timeout: float = DEFAULT_LOCK_TIMEOUT) -> None:
+        self.name = name
+        self.lock_timeout = lock_timeout
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def lock_key(self, key: K) -> str:
+        return KEY_SCHEMA.key(self.__class__.__name__, RedisKeyPrefix.single_flight, self.name, key)
+
+    async def _locked(self, redis: Redis, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        lock = redis.lock(
+            self.lock_key(key),
+            timeout=self.lock_timeout,
+            sleep=0.05,
+            blocking_timeout=self.lock_timeout,
+        )
+        acquired = await lock.acquire()
+
+        try:
+            return await loader()
+
+        finally:
+            if acquired:
+                with suppress(LockError):  # Expired while the loader was running
+                    await lock.release()
+
+    async def do(
+        self,
+        key: K,
+        loader: Callable[[], Awaitable[V]],
+        redis: Redis | None = None,
+    ) -> V:
+        while (future := self._calls.get(key)) is not None:
+            await asyncio.wait((future,))
+
+            if not future.cancelled():
+                return future.result()
+            # The leader was cancelled, so one of the followers takes over
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+
+        try:
+            result = await (loader() if redis is None else self._locked(redis, key, loader))
+
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved, the leader re-raises it anyway
+            raise
+
+        else:
+            future.set_result(result)
+            return result
+
+        finally:
+            del self._calls[key]
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import logging
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from time import perf_counter
+from typing import TYPE_CHECKING, Final
+
+import msgspec
+
+from utils.queued_logging import QueuedLog
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+DEFAULT_THRESHOLD: Final[float] = 0.5  # seconds, faster updates aren't kept
+RING_SIZE: Final[int] = 200  # slow traces kept for `/traces`
+MAX_SPANS: Final[int] = 500  # spans per trace, the rest are only counted
+
+TRACES_LOG: Final[QueuedLog] = QueuedLog(
+    "traces.jsonl",
+    formatter=logging.Formatter("%(message)s"),
+    stderr=False,
+    sample=False,
+)
+
+trace_logger = logging.getLogger("traces")
+trace_logger.setLevel(logging.INFO)
+TRACES_LOG.attach(trace_logger)
+
+
+class Span(msgspec.Struct):
+    name: str
+    start: float  # `perf_counter` while running, ms since the update start in a `Trace`
+    duration: float = 0.0  # seconds while running, ms in a `Trace`
+    children: list[Span] = msgspec.field(default_factory=list)
+
+
+class Trace(msgspec.Struct):
+    update_id: int
+    created_at: datetime
+    root: Span
+    dropped_spans: int = 0
+
+
+class _Active:
+    """Spans budget of the update being traced."""
+
+    __slots__ = ("dropped", "spans")
+
+    def __init__(self) -> None:
+        self.spans = 0
+        self.dropped = 0
+
+
+_current_span: ContextVar[tuple[Span, _Active] | None] = ContextVar("current_span", default=None)
+
+
+def _add_child(name: str) -> tuple[Span, _Active] | None:
+    if (current := _current_span.get()) is None:
+        return None
+
+    parent, active = current
+    if active.spans >= MAX_SPANS:
+        active.dropped += 1
+        return None
+
+    active.spans += 1
+    child = Span(name, perf_counter())
+    parent.children.append(child)
+    return child, active
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block as a child of the current span, does nothing outside of a trace."""
+    if (added := _add_child(name)) is None:
+        yield
+        return
+
+    token = _current_span.set(added)
+    try:
+        yield
+    finally:
+        added[0].duration = perf_counter() - added[0].start
+        _current_span.reset(token)
+
+
+def start_span(name: str) -> Span | None:
+    """Add a span without children, for hooks that can't wrap the timed block in `span`."""
+    return added[0] if (added := _add_child(name)) is not None else None
+
+
+def end_span(span: Span | None) -> None:
+    if span is not None:
+        span.duration = perf_counter() - span.start
+
+
+def _rebased(span: Span, origin: float) -> Span:
+    # Copy, spans of tasks that outlived the update may still be running
+    return Span(
+        span.name,
+        round((span.start - origin) * 1000, 3),
+        round(span.duration * 1000, 3),
+        [_rebased(child, origin) for child in span.children],
+    )
+
+
+class Tracer:
+    """
+    Keeps span trees of updates slower than `threshold` seconds.
+
+    A trace is started per update by `TracingMiddleware`, nested blocks are added with `span`.
+    Slow traces are kept in memory for `/traces` and written to `traces.jsonl`. Fast ones only
+    cost a few objects per instrumented call.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, ring_size: int = RING_SIZE) -> None:
+        self.threshold = threshold
+        self.traces: deque[Trace] = deque(maxlen=ring_size)
+        self._encoder = msgspec.json.Encoder()
+
+    def configure(self, threshold: float) -> None:
+        self.threshold = threshold
+
+    @contextmanager
+    def trace(self, name: str, update_id: int) -> Iterator[None]:
+        root, active = Span(name, perf_counter()), _Active()
+        token = _current_span.set((root, active))
+        try:
+            yield
+        finally:
+            root.duration = perf_counter() - root.start
+            _current_span.reset(token)
+            if root.duration >= self.threshold:
+                self.record(update_id, root, active.dropped)
+
+    def record(self, update_id: int, root: Span, dropped_spans: int = 0) -> Trace:
+        trace = Trace(
+            update_id=update_id,
+            created_at=datetime.now(tz=UTC),
+            root=_rebased(root, root.start),
+            dropped_spans=dropped_spans,
+        )
+        self.traces.append(trace)
+        trace_logger.info(self._encoder.encode(trace).decode())
+        return trace
+
+    def find(self, update_id: int) -> Trace | None:
+        return next((t for t in reversed(self.traces) if t.update_id == update_id), None)
+
+    def slowest(self, limit: int) -> list[Trace]:
+        return sorted(self.traces, key=lambda t: t.root.duration, reverse=True)[:limit]
+
+    @staticmethod
+    def render(trace: Trace) -> list[str]:
+        """Lines of `start  duration  name` in ms, children indented under their parent."""
+        lines = []
+
+        def walk(span: Span, depth: int) -> None:
+            lines.append(f"{span.start:8.1f} {span.duration:8.1f}  {'  ' * depth}{span.name}")
+            for child in span.children:
+                walk(child, depth + 1)
+
+        walk(trace.root, 0)
+        if trace.dropped_spans:
+            lines.append(f"...and {trace.dropped_spans} more spans")
+        return lines
+
+
+TRACER: Final[Tracer] = Tracer()
+
+__all__ = ("TRACER", "TRACES_LOG", "Span", "Trace", "Tracer", "end_span", "span", "start_span")